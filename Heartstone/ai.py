@@ -0,0 +1,293 @@
+import math
+import time
+import random
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from engine import decode_action
+from simulate import POLICIES, END_TURN_ACTION, run_game, winner_side
+
+#сколько ходов доигрывается в одном плейауте
+ROLLOUT_TURNS = 30
+
+#коэффициент исследования UCT
+EXPLORATION = 1.4
+
+#штраф победы за каждый ход до неё, чтобы быстрый выигрыш был лучше долгого
+TURN_PENALTY = 0.01
+
+#размер таблицы транспозиций: 2 ** TABLE_BITS корзин по два места
+TABLE_BITS = 16
+
+
+class TranspositionTable:
+    """позиции по хэшу Zobrist: фиксированный размер, в каждой корзине два места"""
+
+    def __init__(self, bits=TABLE_BITS):
+        self.mask = (1 << bits) - 1
+        size = 2 << bits
+        self.keys = [None] * size
+        self.values = [None] * size
+        self.priorities = [0] * size
+        self.entries = 0
+
+        #статистика
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def get(self, key):
+        """значение для хэша, None если его нет"""
+        self.lookups += 1
+        i = (key & self.mask) << 1
+        if self.keys[i] == key:
+            self.hits += 1
+            return self.values[i]
+        if self.keys[i + 1] == key:
+            self.hits += 1
+            return self.values[i + 1]
+        return None
+
+    def put(self, key, value, priority=0):
+        """запись: первое место держит более ценную запись, второе заменяется всегда"""
+        self.stores += 1
+        i = (key & self.mask) << 1
+        keys = self.keys
+        if keys[i] == key:
+            self._place(i, key, value, priority)
+        elif keys[i + 1] == key:
+            self._place(i + 1, key, value, priority)
+        elif keys[i] is None or priority >= self.priorities[i]:
+            #вытесненная с первого места запись переезжает на второе
+            if keys[i] is not None:
+                self._place(i + 1, keys[i], self.values[i], self.priorities[i])
+            self._place(i, key, value, priority)
+        else:
+            self._place(i + 1, key, value, priority)
+
+    def _place(self, i, key, value, priority):
+        """запись в место i с учётом заполненности"""
+        if self.keys[i] is None:
+            self.entries += 1
+        elif self.keys[i] != key:
+            self.replacements += 1
+        self.keys[i] = key
+        self.values[i] = value
+        self.priorities[i] = priority
+
+    def clear(self):
+        """очистка таблицы"""
+        size = len(self.keys)
+        self.keys = [None] * size
+        self.values = [None] * size
+        self.priorities = [0] * size
+        self.entries = 0
+
+    def stats(self):
+        """заполненность и процент попаданий"""
+        return {
+            "entries": self.entries,
+            "capacity": len(self.keys),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+        }
+
+
+class Node:
+    """позиция в дереве поиска, общая для всех порядков действий, которые к ней ведут"""
+
+    __slots__ = ("side", "children", "untried", "visits", "wins")
+
+    def __init__(self, side, untried):
+        #кто ходит в этой позиции
+        self.side = side
+        #рёбра (код действия, узел)
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        #выигрыши с точки зрения каждой из сторон
+        self.wins = [0.0, 0.0]
+
+    def best_child(self):
+        """ребро с лучшей оценкой UCT для ходящего"""
+        log_visits = math.log(self.visits)
+        side = self.side
+        best = None
+        best_score = -1.0
+        for edge in self.children:
+            child = edge[1]
+            score = child.wins[side] / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = edge, score
+        return best
+
+
+def redeal_hand(player, rng):
+    """рука соперника не видна: новая рука того же размера из его руки и колоды"""
+    pool = [card.template for card in player.hand]
+    pool.extend(player.deck)
+    rng.shuffle(pool)
+    size = len(player.hand)
+    player.hand.clear()
+    for template in pool[:size]:
+        player.hand.append(player.card_class(template))
+    player.deck = deque(pool[size:])
+
+
+def search(state, budget=0.5, rollout="greedy", seed=None, table_bits=TABLE_BITS):
+    """MCTS за budget секунд, возвращает (лучшее действие, статистика)"""
+    rng = random.Random(seed)
+    policy = POLICIES[rollout]
+    table = TranspositionTable(table_bits)
+    root = Node(state.side(), state.legal_actions())
+    table.put(state.compute_hash(), root)
+    started = time.perf_counter()
+    deadline = started + budget
+    playouts = 0
+    transpositions = 0
+    max_depth = 0
+    total_depth = 0
+
+    #единственное действие - конец хода, думать не о чем
+    while len(root.untried) > 1 or root.children:
+        if time.perf_counter() >= deadline:
+            break
+
+        #своя копия на плейаут без журнала: clone дешевле отката доигрывания
+        game = state.clone(record=False)
+        #порядок своей колоды неизвестен, рука соперника тоже - раздаём заново
+        own = game.player1 if root.side == 0 else game.player2
+        rng.shuffle(own.deck)
+        redeal_hand(game.player2 if own is game.player1 else game.player1, rng)
+
+        #спуск по дереву
+        node = root
+        path = [root]
+        while not node.untried and node.children and not game.is_over():
+            code, child = node.best_child()
+            if not game.apply_code(code):
+                #в этой раздаче действие невозможно - плейаут отсюда
+                break
+            node = child
+            path.append(node)
+
+        #новый узел, если позиция уже встречалась другим порядком действий - ребро к ней
+        if node.untried and not game.is_over():
+            code = node.untried.pop(rng.randrange(len(node.untried)))
+            if game.apply_code(code):
+                #хэш нужен один раз на плейаут: пересчёт дешевле, чем вести его на каждом шаге спуска
+                key = game.compute_hash()
+                child = table.get(key)
+                if child is None or child in path:
+                    untried = game.legal_actions()
+                    child = Node(game.side(), untried)
+                    #ближе к корню - больше посещений, такие узлы ценнее
+                    table.put(key, child, -len(path))
+                else:
+                    transpositions += 1
+                node.children.append((code, child))
+                node = child
+                path.append(node)
+
+        #доигрывание стратегией
+        if not game.is_over():
+            run_game(game, (policy, policy), rng, game.turn_number + ROLLOUT_TURNS)
+        winner = winner_side(game)
+        reward = max(0.5, 1.0 - TURN_PENALTY * (game.turn_number - state.turn_number))
+
+        #обратный проход по пройденному пути
+        for node in path:
+            node.visits += 1
+            if winner < 0:
+                node.wins[0] += 0.5
+                node.wins[1] += 0.5
+            else:
+                node.wins[winner] += reward
+        depth = len(path) - 1
+
+        playouts += 1
+        total_depth += depth
+        max_depth = max(max_depth, depth)
+
+    elapsed = time.perf_counter() - started
+    if root.children:
+        code, best = max(root.children, key=lambda edge: edge[1].visits)
+        win_rate = best.wins[root.side] / best.visits
+    else:
+        code, win_rate = root.untried[0], 0.0
+    action = decode_action(code)
+
+    stats = {
+        "playouts": playouts,
+        "playouts_per_second": playouts / elapsed if elapsed > 0 else 0.0,
+        "max_depth": max_depth,
+        "average_depth": total_depth / playouts if playouts else 0.0,
+        "win_rate": win_rate,
+        "transpositions": transpositions,
+        "table": table.stats(),
+        "elapsed": elapsed,
+    }
+    return action, stats
+
+
+class AIPlayer:
+    """компьютерный соперник: поиск идёт в отдельном процессе, игра не ждёт"""
+
+    def __init__(self, budget=0.5, rollout="greedy", action_delay=0.4):
+        #секунд на одно решение
+        self.budget = budget
+        self.rollout = rollout
+        #пауза между действиями, чтобы ходы было видно
+        self.action_delay = action_delay
+        self.executor = None
+        self.future = None
+        self.next_action_time = 0.0
+        self.last_stats = None
+
+    def thinking(self):
+        """идёт ли поиск"""
+        return self.future is not None
+
+    def start(self, state):
+        """запуск поиска по копии состояния"""
+        if self.executor is None:
+            #spawn: процесс поиска не тянет за собой окно и звук
+            context = multiprocessing.get_context("spawn")
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        self.future = self.executor.submit(search, state.clone(), self.budget, self.rollout,
+                                           random.getrandbits(32))
+
+    def poll(self, state):
+        """готовое действие или None, сам запускает поиск когда пора"""
+        if self.future is None:
+            if time.perf_counter() >= self.next_action_time:
+                self.start(state)
+            return None
+        if not self.future.done():
+            return None
+
+        try:
+            action, self.last_stats = self.future.result()
+        except Exception as e:
+            #процесс поиска упал - ход заканчивается, следующий поиск поднимет новый процесс
+            print(f"AI search failed: {e}")
+            self.shutdown()
+            action, self.last_stats = END_TURN_ACTION, None
+        self.future = None
+        self.next_action_time = time.perf_counter() + self.action_delay
+        return action
+
+    def cancel(self):
+        """забыть текущий поиск, например при рестарте"""
+        self.future = None
+
+    def shutdown(self):
+        """остановка процесса поиска"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.future = None
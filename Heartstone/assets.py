@@ -0,0 +1,365 @@
+import os
+import mmap
+import time
+import struct
+import hashlib
+import pygame
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from storage import write_atomic
+
+
+#кэш отскейленных картинок на диске, от модуля: из другой папки запуска тот же кэш
+DISK_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "textures")
+
+
+class DiskTextureCache:
+    """готовые пиксели на диске: старт без декода jpeg и скейла"""
+
+    #магия, версия, ширина, высота, каналы, mtime и размер исходника
+    HEADER = struct.Struct("<4sHHHBxQQ")
+    MAGIC = b"HSTX"
+    VERSION = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.enabled = True
+
+        #статистика
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _file(self, path, size, smooth):
+        """файл кэша для картинки и размера"""
+        name = hashlib.sha1(repr((path, size, smooth)).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".raw")
+
+    def load(self, path, size, smooth):
+        """пиксели из кэша, None если их нет или исходник изменился"""
+        if not self.enabled:
+            return None
+
+        try:
+            source = os.stat(path)
+            with open(self._file(path, size, smooth), "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if len(data) < self.HEADER.size:
+            self.misses += 1
+            return None
+
+        magic, version, width, height, channels, mtime, source_size = self.HEADER.unpack_from(data)
+        if (magic != self.MAGIC or version != self.VERSION or mtime != source.st_mtime_ns
+                or source_size != source.st_size
+                or len(data) != self.HEADER.size + width * height * channels):
+            self.misses += 1
+            return None
+
+        #поверхность смотрит прямо в отображённый файл
+        pixels = memoryview(data)[self.HEADER.size:]
+        self.hits += 1
+        return pygame.image.frombuffer(pixels, (width, height), "RGBA" if channels == 4 else "RGB")
+
+    def save(self, path, size, smooth, surface):
+        """запись готовых пикселей, ошибки записи не мешают игре"""
+        if not self.enabled:
+            return
+
+        channels = 4 if surface.get_flags() & pygame.SRCALPHA else 3
+        pixels = pygame.image.tobytes(surface, "RGBA" if channels == 4 else "RGB")
+        width, height = surface.get_size()
+        target = self._file(path, size, smooth)
+        try:
+            source = os.stat(path)
+            header = self.HEADER.pack(self.MAGIC, self.VERSION, width, height, channels,
+                                      source.st_mtime_ns, source.st_size)
+            write_atomic(target, header, pixels)
+            self.writes += 1
+        except OSError:
+            pass
+
+    def stats(self):
+        """попадания в дисковый кэш"""
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+
+disk_cache = DiskTextureCache(DISK_CACHE_DIR)
+
+
+def decode_image(path, size=None, smooth=False):
+    """декод и скейл картинки, без обращения к экрану - можно из потока"""
+    surface = disk_cache.load(path, size, smooth)
+    if surface is not None:
+        return surface
+
+    try:
+        surface = pygame.image.load(path)
+    except (pygame.error, FileNotFoundError):
+        return None
+
+    if size is not None and surface.get_size() != size:
+        if smooth:
+            surface = pygame.transform.smoothscale(surface, size)
+        else:
+            surface = pygame.transform.scale(surface, size)
+
+    disk_cache.save(path, size, smooth, surface)
+    return surface
+
+
+class TextureCache:
+    """общий кэш текстур: один файл грузится один раз на (путь, размер)"""
+
+    def __init__(self, budget_bytes=None):
+        #бюджет памяти в байтах, None - без ограничений
+        self.budget_bytes = budget_bytes
+        self._surfaces = OrderedDict()
+        self._sizes = {}
+        self.total_bytes = 0
+
+        #ключи, которые сейчас декодируются в фоне
+        self.pending = set()
+
+        #статистика
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path, size=None, alpha=False, smooth=False):
+        """поверхность для пути и размера, None если файл не загрузился или ещё грузится"""
+        if not path:
+            return None
+
+        key = (path, size, alpha, smooth)
+        if key in self._surfaces:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return self._surfaces[key]
+
+        #текстура декодируется в фоне - пока заглушка
+        if key in self.pending:
+            return None
+
+        self.misses += 1
+        surface = self.finish(decode_image(path, size, smooth), alpha)
+        self._store(key, surface)
+        return surface
+
+    def is_pending(self, path, size=None, alpha=False, smooth=False):
+        """грузится ли текстура в фоне"""
+        return (path, size, alpha, smooth) in self.pending
+
+    def contains(self, key):
+        """есть ли готовая текстура"""
+        return key in self._surfaces
+
+    def lookup(self, key):
+        """собранная из текстур поверхность по своему ключу, None если её нет или она вытеснена"""
+        #в счётчики не идёт: попадания и промахи считаются по самим текстурам
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+        return surface
+
+    def store(self, key, surface):
+        """собранная поверхность под тот же бюджет, что и текстуры"""
+        self._store(key, surface)
+
+    def release(self, path, size=None, alpha=False, smooth=False):
+        """текстура пока не нужна, например уже собрана в лицо карты: вытесняется первой"""
+        key = (path, size, alpha, smooth)
+        if key in self._surfaces:
+            self._surfaces.move_to_end(key, last=False)
+
+    def finish(self, surface, alpha):
+        """конверт под формат экрана, возможен только после создания окна"""
+        if surface is not None and pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() if alpha else surface.convert()
+        return surface
+
+    def put(self, key, surface):
+        """готовая текстура из фоновой загрузки"""
+        self.pending.discard(key)
+        self.misses += 1
+        self._store(key, self.finish(surface, key[2]))
+
+    def _store(self, key, surface):
+        """сохранение в кэш с учётом бюджета"""
+        nbytes = surface.get_pitch() * surface.get_height() if surface else 0
+        self._surfaces[key] = surface
+        self._sizes[key] = nbytes
+        self.total_bytes += nbytes
+        self._evict()
+
+    def _evict(self):
+        """выкидывание самых старых текстур сверх бюджета"""
+        if self.budget_bytes is None:
+            return
+
+        #последнюю добавленную текстуру не трогаем
+        while self.total_bytes > self.budget_bytes and len(self._surfaces) > 1:
+            key, _ = self._surfaces.popitem(last=False)
+            self.total_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def set_budget(self, budget_bytes):
+        """новый бюджет памяти, лишнее выкидывается сразу"""
+        self.budget_bytes = budget_bytes
+        self._evict()
+
+    def clear(self):
+        """очистка кэша"""
+        self._surfaces.clear()
+        self._sizes.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        """счётчики попаданий и промахов"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._surfaces),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TextCache:
+    """LRU кэш отрисованного текста по (шрифт, текст, цвет, сглаживание)"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._fonts = {}
+        self._surfaces = OrderedDict()
+
+        #статистика
+        self.hits = 0
+        self.misses = 0
+
+    def get_font(self, size, face=None):
+        """один объект шрифта на (шрифт, размер)"""
+        key = (face, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(face, size)
+            self._fonts[key] = font
+        return font
+
+    def render(self, font, text, color, antialias=True):
+        """отрисованный текст, перерисовывается только новая строка"""
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """очистка отрисованного текста"""
+        self._surfaces.clear()
+
+    def stats(self):
+        """размер кэша и процент попаданий"""
+        lookups = self.hits + self.misses
+        return {
+            "fonts": len(self._fonts),
+            "entries": len(self._surfaces),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class AssetLoader:
+    """фоновая загрузка ассетов пулом потоков"""
+
+    def __init__(self, cache, workers=None):
+        self.cache = cache
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.executor = None
+        self._textures = {}
+        self._tasks = []
+
+        #прогресс
+        self.total = 0
+        self.completed = 0
+        self.started = None
+        self.elapsed = None
+
+    def _submit(self, fn, *args):
+        """задача в пул, пул создаётся при первой задаче"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="assets")
+        if self.started is None or self.elapsed is not None:
+            self.started = time.perf_counter()
+            self.elapsed = None
+        self.total += 1
+        return self.executor.submit(fn, *args)
+
+    def request_texture(self, path, size=None, alpha=False, smooth=False):
+        """декод текстуры в фоне, повторные запросы не дублируются"""
+        key = (path, size, alpha, smooth)
+        if not path or key in self._textures or self.cache.contains(key):
+            return
+        self.cache.pending.add(key)
+        self._textures[key] = self._submit(decode_image, path, size, smooth)
+
+    def submit(self, fn, *args):
+        """любая фоновая задача, результат забирает вызывающий"""
+        future = self._submit(fn, *args)
+        self._tasks.append(future)
+        return future
+
+    def poll(self):
+        """перенос готовых текстур в кэш, вызывается из главного потока"""
+        for key, future in list(self._textures.items()):
+            if future.done():
+                del self._textures[key]
+                self.cache.put(key, future.result())
+                self.completed += 1
+
+        for future in [f for f in self._tasks if f.done()]:
+            self._tasks.remove(future)
+            self.completed += 1
+
+        if self.is_done() and self.elapsed is None and self.started is not None:
+            self.elapsed = time.perf_counter() - self.started
+        return self.progress()
+
+    def progress(self):
+        """доля готовых задач от 0 до 1"""
+        return self.completed / self.total if self.total else 1.0
+
+    def is_done(self):
+        """всё ли загружено"""
+        return not self._textures and not self._tasks
+
+
+#общие кэши на весь процесс
+textures = TextureCache()
+text_cache = TextCache()
+loader = AssetLoader(textures)
+
+
+def get_font(size, face=None):
+    """шрифт из общего реестра"""
+    return text_cache.get_font(size, face)
+
+
+def render_text(font, text, color, antialias=True):
+    """текст из общего кэша"""
+    return text_cache.render(font, text, color, antialias)
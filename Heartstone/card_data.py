@@ -0,0 +1,179 @@
+import os
+import json
+import pickle
+import hashlib
+from storage import write_atomic
+
+#пути от модуля: карты грузятся при импорте engine, запуск не из корня репозитория не должен его ломать
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+#описания карт
+CARDS_PATH = os.path.join(_HERE, "data", "cards.json")
+
+#разобранные и проверенные описания, ключ - хэш содержимого файла
+CACHE_PATH = os.path.join(_HERE, ".cache", "cards.pickle")
+
+#версия формата строк: смена сбрасывает кэш
+FORMAT_VERSION = 1
+
+#типы карт, которые умеют правила
+CARD_TYPES = ("minion", "spell")
+
+#эффекты и число их параметров
+EFFECT_ARITY = {"damage": 1, "heal": 1, "buff": 2}
+
+#поля карты: обязательные и необязательные
+REQUIRED = {
+    "minion": ("name", "type", "cost", "attack", "health", "image"),
+    "spell": ("name", "type", "cost", "effect", "image"),
+}
+OPTIONAL = ("description", "icons")
+
+#иконки по роли
+ICON_ROLES = ("cost", "attack", "health", "spell")
+
+
+class CardDataError(ValueError):
+    """ошибки в файле карт, все сразу"""
+
+    def __init__(self, path, errors):
+        self.errors = errors
+        super().__init__(f"{path}: " + "; ".join(errors))
+
+
+def _is_int(value):
+    #bool в json тоже int, картам он не подходит
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_icons(icons, where, errors):
+    """иконки: роль -> путь"""
+    if not isinstance(icons, dict):
+        errors.append(f"{where}: icons must be an object")
+        return {}
+    for role, path in icons.items():
+        if role not in ICON_ROLES:
+            errors.append(f"{where}: unknown icon role {role!r}")
+        elif not isinstance(path, str):
+            errors.append(f"{where}: icon {role!r} must be a path")
+    return icons
+
+
+def _check_card(card, index, names, errors):
+    """проверка одной карты, список ошибок пополняется"""
+    if not isinstance(card, dict):
+        errors.append(f"card {index}: must be an object")
+        return
+    where = f"card {index} {card.get('name', '')!r}"
+    card_type = card.get("type")
+    if card_type not in CARD_TYPES:
+        errors.append(f"{where}: type must be one of {', '.join(CARD_TYPES)}")
+        return
+
+    for field in REQUIRED[card_type]:
+        if field not in card:
+            errors.append(f"{where}: missing {field!r}")
+    for field in card:
+        if field not in REQUIRED[card_type] and field not in OPTIONAL:
+            errors.append(f"{where}: unexpected field {field!r}")
+
+    name = card.get("name")
+    if not isinstance(name, str) or not name:
+        errors.append(f"{where}: name must be a non-empty string")
+    elif name in names:
+        errors.append(f"{where}: duplicate name")
+    else:
+        names.add(name)
+
+    if "cost" in card and (not _is_int(card["cost"]) or card["cost"] < 0):
+        errors.append(f"{where}: cost must be a non-negative integer")
+    if card_type == "minion":
+        if "attack" in card and (not _is_int(card["attack"]) or card["attack"] < 0):
+            errors.append(f"{where}: attack must be a non-negative integer")
+        if "health" in card and (not _is_int(card["health"]) or card["health"] < 1):
+            errors.append(f"{where}: health must be a positive integer")
+    for field in ("description", "image"):
+        if field in card and not isinstance(card[field], str):
+            errors.append(f"{where}: {field} must be a string")
+    if "icons" in card:
+        _check_icons(card["icons"], where, errors)
+
+    if "effect" in card:
+        effect = card["effect"]
+        #null тоже ошибка: у заклинания без эффекта нечего разыгрывать
+        if (not isinstance(effect, list) or not effect or effect[0] not in EFFECT_ARITY or
+                len(effect) != EFFECT_ARITY[effect[0]] + 1 or not all(_is_int(v) for v in effect[1:])):
+            errors.append(f"{where}: effect must be [\"damage\", n], [\"heal\", n] or [\"buff\", attack, health]")
+        elif effect[0] in ("damage", "heal") and effect[1] < 0:
+            #знак уже задаёт вид эффекта, минус перевернул бы spell_damage
+            errors.append(f"{where}: {effect[0]} amount must be non-negative")
+
+
+def _row(card, icons):
+    """строка для engine: поля CardTemplate по порядку, тип и эффект по имени"""
+    card_type = card["type"]
+    card_icons = dict(icons.get(card_type, {}))
+    card_icons.update(card.get("icons", {}))
+
+    #spell_damage остаётся для отрисовки: урон плюсом, лечение минусом
+    effect = tuple(card["effect"]) if "effect" in card else None
+    spell_damage = 0
+    if effect is not None and effect[0] == "damage":
+        spell_damage = effect[1]
+    elif effect is not None and effect[0] == "heal":
+        spell_damage = -effect[1]
+
+    return (card["name"], card["cost"], card_type, card.get("description", ""),
+            card.get("attack", 0), card.get("health", 0), spell_damage, card["image"],
+            card_icons.get("cost"), card_icons.get("attack"), card_icons.get("health"),
+            card_icons.get("spell"), effect)
+
+
+def parse_cards(text, path=CARDS_PATH):
+    """разбор и проверка файла карт, CardDataError со всеми ошибками сразу"""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise CardDataError(path, [str(e)])
+
+    errors = []
+    if not isinstance(data, dict) or data.get("version") != 1 or not isinstance(data.get("cards"), list):
+        raise CardDataError(path, ["expected {\"version\": 1, \"cards\": [...]}"])
+    icons = data.get("icons", {})
+    if not isinstance(icons, dict):
+        errors.append("icons must be an object")
+        icons = {}
+    for card_type, type_icons in icons.items():
+        if card_type not in CARD_TYPES:
+            errors.append(f"icons: unknown card type {card_type!r}")
+        else:
+            _check_icons(type_icons, f"icons {card_type!r}", errors)
+
+    names = set()
+    for index, card in enumerate(data["cards"]):
+        _check_card(card, index, names, errors)
+    if errors:
+        raise CardDataError(path, errors)
+    return [_row(card, icons) for card in data["cards"]]
+
+
+def load_cards(path=CARDS_PATH, cache_path=CACHE_PATH):
+    """строки карт: из кэша, если файл не менялся, иначе разбор, проверка и запись кэша"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    key = hashlib.blake2b(raw, digest_size=16, person=b"cards%d" % FORMAT_VERSION).hexdigest()
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached_key, rows = pickle.load(f)
+        if cached_key == key:
+            return rows
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        pass
+
+    rows = parse_cards(raw.decode("utf-8"), path)
+    try:
+        write_atomic(cache_path, pickle.dumps((key, rows), protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass
+    return rows
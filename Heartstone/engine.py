@@ -0,0 +1,1006 @@
+import random
+import hashlib
+from array import array
+from enum import Enum
+from collections import deque, namedtuple
+from card_data import load_cards
+
+
+class CardType(Enum):
+    MINION = "minion"
+    SPELL = "spell"
+    WEAPON = "weapon"
+
+
+#лимит карт в руке и существ на столе
+HAND_LIMIT = 7
+BOARD_LIMIT = 7
+
+#размер колоды и копий одной карты в ней
+DECK_SIZE = 30
+COPY_LIMIT = 2
+
+#действия игрока
+PLAY_CARD = 0
+ATTACK = 1
+END_TURN = 2
+
+#цели действий: герои, существа соперника с 2, свои с 9
+TARGET_NONE = -1
+TARGET_ENEMY_HERO = 0
+TARGET_OWN_HERO = 1
+TARGET_ENEMY_MINION = 2
+TARGET_OWN_MINION = TARGET_ENEMY_MINION + BOARD_LIMIT
+
+#на кого разыгрывается карта: существо без цели, урон по соперникам, лечение своих, бафф существ
+TARGETS_NONE = 0
+TARGETS_ENEMIES = 1
+TARGETS_OWN = 2
+TARGETS_MINIONS = 3
+
+Action = namedtuple("Action", ["kind", "index", "target"])
+
+
+def encode_action(kind, index=0, target=TARGET_NONE):
+    """действие одним числом: вид, индекс и цель по битам"""
+    return kind << 8 | index << 5 | target + 1
+
+
+def decode_action(code):
+    """Action по коду encode_action"""
+    return Action(code >> 8, code >> 5 & 7, (code & 31) - 1)
+
+
+END_TURN_CODE = encode_action(END_TURN)
+
+#номера установленных битов для каждой маски руки или стола
+MASK_BITS = [tuple(i for i in range(HAND_LIMIT) if mask >> i & 1) for mask in range(1 << HAND_LIMIT)]
+
+
+def drop_bit(mask, i):
+    """маска после удаления места i из зоны: старшие биты сдвигаются вниз"""
+    return mask & ((1 << i) - 1) | mask >> (i + 1) << i
+
+
+def _target_codes(targets, own_count, enemy_count):
+    """цели розыгрыша при таких столах"""
+    enemy_minions = [TARGET_ENEMY_MINION + j for j in range(enemy_count)]
+    own_minions = [TARGET_OWN_MINION + j for j in range(own_count)]
+    if targets == TARGETS_ENEMIES:
+        return [TARGET_ENEMY_HERO] + enemy_minions
+    if targets == TARGETS_OWN:
+        return [TARGET_OWN_HERO] + own_minions
+    if targets == TARGETS_MINIONS:
+        return own_minions + enemy_minions
+    return [TARGET_NONE]
+
+
+#готовые списки кодов: [цели][индекс][своих существ][существ соперника]
+PLAY_CODES = [[[[[encode_action(PLAY_CARD, i, target) for target in _target_codes(targets, own, enemy)]
+                for enemy in range(BOARD_LIMIT + 1)]
+               for own in range(BOARD_LIMIT + 1)]
+              for i in range(HAND_LIMIT)]
+             for targets in (TARGETS_NONE, TARGETS_ENEMIES, TARGETS_OWN, TARGETS_MINIONS)]
+
+#[цели][код цели + 1]: допустима ли цель для класса целей карты, то же, что перечисляет legal_actions
+VALID_TARGETS = [[code in _target_codes(targets, BOARD_LIMIT, BOARD_LIMIT) for code in range(TARGET_NONE, TARGET_OWN_MINION + BOARD_LIMIT)]
+                 for targets in (TARGETS_NONE, TARGETS_ENEMIES, TARGETS_OWN, TARGETS_MINIONS)]
+
+#[индекс атакующего][существ соперника]
+ATTACK_CODES = [[[encode_action(ATTACK, i, target) for target in _target_codes(TARGETS_ENEMIES, 0, enemy)]
+                 for enemy in range(BOARD_LIMIT + 1)]
+                for i in range(BOARD_LIMIT)]
+
+#зоны для хэша позиции
+HAND_ZONE = 0
+BOARD_ZONE = 1
+
+#коды эффектов карт: эффект - (код, параметр, параметр)
+EFFECT_NONE = 0
+EFFECT_DAMAGE = 1
+EFFECT_HEAL = 2
+EFFECT_BUFF = 3
+
+NO_EFFECT = (EFFECT_NONE, 0, 0)
+
+
+def damage_effect(amount):
+    """урон цели"""
+    return (EFFECT_DAMAGE, amount, 0)
+
+
+def heal_effect(amount):
+    """лечение цели"""
+    return (EFFECT_HEAL, amount, 0)
+
+
+def buff_effect(attack, health):
+    """прибавка к атаке и здоровью существа, здоровье может уйти в минус"""
+    return (EFFECT_BUFF, attack, health)
+
+
+def _apply_none(target, a, b):
+    pass
+
+
+def _apply_damage(target, amount, _):
+    target.take_damage(amount)
+
+
+def _apply_heal(target, amount, _):
+    target.heal(amount)
+
+
+def _apply_buff(target, attack, health):
+    #герою баффать нечего
+    if isinstance(target, CardState):
+        target.attack += attack
+        target.health += health
+
+
+#обработчики по коду эффекта: применение - один вызов по индексу
+EFFECTS = [_apply_none, _apply_damage, _apply_heal, _apply_buff]
+
+#цели розыгрыша заклинания по коду эффекта
+EFFECT_TARGETS = [TARGETS_NONE, TARGETS_ENEMIES, TARGETS_OWN, TARGETS_MINIONS]
+
+
+def spell_effect(spell_damage):
+    """эффект по старому полю spell_damage: плюс - урон, минус - лечение"""
+    if spell_damage > 0:
+        return damage_effect(spell_damage)
+    if spell_damage < 0:
+        return heal_effect(-spell_damage)
+    return NO_EFFECT
+
+
+class CardTemplate:
+    """неизменная часть карты, один объект на все копии"""
+
+    __slots__ = ("id", "name", "cost", "card_type", "description", "attack", "health", "spell_damage",
+                 "image_path", "cost_icon_path", "attack_icon_path", "health_icon_path", "spell_icon_path",
+                 "effect", "targets")
+
+    def __init__(self, template_id, name, cost, card_type, description="", attack=0, health=0, spell_damage=0, image_path=None, cost_icon_path=None, attack_icon_path=None, health_icon_path=None, spell_icon_path=None, effect=None):
+        self.id = template_id
+        self.name = name
+        self.cost = cost
+        self.card_type = card_type
+        self.description = description
+        self.attack = attack
+        self.health = health
+        self.spell_damage = spell_damage
+
+        #пути картинок, грузит их только отрисовка
+        self.image_path = image_path
+        self.cost_icon_path = cost_icon_path
+        self.attack_icon_path = attack_icon_path
+        self.health_icon_path = health_icon_path
+        self.spell_icon_path = spell_icon_path
+
+        #эффект розыгрыша, без явного - из spell_damage
+        self.effect = effect if effect is not None else spell_effect(spell_damage)
+
+        #цели розыгрыша для генератора ходов
+        if card_type == CardType.MINION:
+            self.targets = TARGETS_NONE
+        else:
+            self.targets = EFFECT_TARGETS[self.effect[0]]
+
+    def __repr__(self):
+        return f"CardTemplate({self.id}, {self.name!r})"
+
+    def __reduce__(self):
+        #в другой процесс уходит только id, шаблон там берётся из TEMPLATES
+        return get_template, (self.id,)
+
+
+#эффекты из файла карт по имени
+EFFECT_BUILDERS = {"damage": damage_effect, "heal": heal_effect, "buff": buff_effect}
+
+
+def make_template(template_id, row):
+    """шаблон из строки card_data.load_cards"""
+    (name, cost, card_type, description, attack, health, spell_damage, image_path,
+     cost_icon_path, attack_icon_path, health_icon_path, spell_icon_path, effect) = row
+    if effect is not None:
+        effect = EFFECT_BUILDERS[effect[0]](*effect[1:])
+    return CardTemplate(template_id, name, cost, CardType(card_type), description, attack, health, spell_damage,
+                        image_path, cost_icon_path, attack_icon_path, health_icon_path, spell_icon_path, effect)
+
+
+class TemplatePool:
+    """шаблоны по id: строки описаний есть сразу, объект шаблона создаётся при первом обращении"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.templates = [None] * len(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, template_id):
+        #индексы как у списка: срезы, отрицательные с конца, за пределами - IndexError
+        if isinstance(template_id, slice):
+            return [self[i] for i in range(*template_id.indices(len(self.rows)))]
+        if template_id < 0:
+            template_id += len(self.rows)
+            if template_id < 0:
+                raise IndexError("template id out of range")
+        template = self.templates[template_id]
+        if template is None:
+            template = make_template(template_id, self.rows[template_id])
+            self.templates[template_id] = template
+        return template
+
+    def __iter__(self):
+        for template_id in range(len(self.rows)):
+            yield self[template_id]
+
+
+#все шаблоны по id, описания в data/cards.json
+TEMPLATES = TemplatePool(load_cards())
+
+
+def get_template(template_id):
+    """шаблон по id"""
+    return TEMPLATES[template_id]
+
+
+def _template_field(name):
+    """поле копии карты, которое читается из шаблона"""
+    return property(lambda self: getattr(self.template, name))
+
+
+class CardState:
+    """копия карты в партии: только меняющиеся статы, остальное в шаблоне"""
+
+    __slots__ = ("template", "attack", "health", "max_health", "can_attack", "has_attacked", "summoning_sickness")
+
+    #статичные поля общие для всех копий
+    name = _template_field("name")
+    cost = _template_field("cost")
+    card_type = _template_field("card_type")
+    description = _template_field("description")
+    spell_damage = _template_field("spell_damage")
+    image_path = _template_field("image_path")
+    cost_icon_path = _template_field("cost_icon_path")
+    attack_icon_path = _template_field("attack_icon_path")
+    health_icon_path = _template_field("health_icon_path")
+    spell_icon_path = _template_field("spell_icon_path")
+
+    def __init__(self, template):
+        self.template = template
+        self.attack = template.attack
+        self.health = template.health
+        self.max_health = template.health
+        self.can_attack = False
+        self.has_attacked = False
+        self.summoning_sickness = True
+
+    def copy(self):
+        """копия без отрисовки: шаблон и шесть чисел"""
+        card = CardState.__new__(CardState)
+        card.template = self.template
+        card.attack = self.attack
+        card.health = self.health
+        card.max_health = self.max_health
+        card.can_attack = self.can_attack
+        card.has_attacked = self.has_attacked
+        card.summoning_sickness = self.summoning_sickness
+        return card
+
+    def reset_turn(self):
+        """новый карт стейт после хода"""
+        if self.card_type == CardType.MINION:
+            self.can_attack = True
+            self.has_attacked = False
+            self.summoning_sickness = False
+
+    def take_damage(self, damage):
+        """нанесение существу урона"""
+        if self.card_type == CardType.MINION:
+            self.health -= damage
+            return self.health <= 0
+        return False
+
+    def attack_target(self, target):
+        """атака игрока или существа"""
+        if self.card_type != CardType.MINION or self.has_attacked or self.summoning_sickness:
+            return False
+
+        if hasattr(target, 'take_damage'):
+            target.take_damage(self.attack)
+            #существо-цель бьёт в ответ
+            if hasattr(target, 'attack') and target.attack > 0:
+                self.take_damage(target.attack)
+
+            self.has_attacked = True
+            return True
+        return False
+
+    def can_attack_target(self):
+        """проверка на возможность атаки"""
+        return (self.card_type == CardType.MINION and
+                not self.has_attacked and
+                not self.summoning_sickness and
+                self.attack > 0)
+
+    def heal(self, amount):
+        """исцеление карты"""
+        if self.card_type == CardType.MINION:
+            self.health = min(self.max_health, self.health + amount)
+
+
+#коллекция карт в порядке файла - те же шаблоны
+CARD_DATABASE = TEMPLATES
+
+
+def make_rng(seed=None):
+    """генератор по сиду, готовый генератор как есть, None - общий random"""
+    if seed is None:
+        return random
+    #random.Random или сам модуль random
+    if hasattr(seed, "sample"):
+        return seed
+    return random.Random(seed)
+
+
+#id каждой карты базы по COPY_LIMIT раз - из этого набора тянутся колоды
+_deck_pool = None
+
+
+def deck_pool():
+    """набор id для колод, считается один раз на базу карт"""
+    global _deck_pool
+    if _deck_pool is None or len(_deck_pool) != len(CARD_DATABASE) * COPY_LIMIT:
+        #id шаблона - его место в базе, сами шаблоны не нужны
+        _deck_pool = [template_id for template_id in range(len(CARD_DATABASE)) for _ in range(COPY_LIMIT)]
+    return _deck_pool
+
+
+def deck_from_ids(ids):
+    """шаблоны колоды по id карт"""
+    return [TEMPLATES[int(template_id)] for template_id in ids]
+
+
+def create_random_deck(seed=None):
+    """колода из шаблонов по сиду: число, random.Random или None - общий random"""
+    rng = make_rng(seed)
+    #выборка без возвращения уже держит лимит копий
+    return deck_from_ids(rng.sample(deck_pool(), DECK_SIZE))
+
+
+def create_decks(count, seed=None, as_array=False):
+    """сразу count колод: списки шаблонов или массив numpy (count, DECK_SIZE) из id"""
+    rng = make_rng(seed)
+    if not as_array:
+        pool = deck_pool()
+        return [deck_from_ids(rng.sample(pool, DECK_SIZE)) for _ in range(count)]
+
+    import numpy as np
+    #генератор numpy от того же rng: сид, random.Random или None работают одинаково в обоих режимах.
+    #колоды повторяются по сиду, но тянутся не так, как списки: колоды GameState(seed) - vector_sim.decks_for_seeds
+    generator = np.random.default_rng(rng.getrandbits(64))
+    pool = np.array(deck_pool(), dtype=np.int16)
+    #случайный порядок всего набора в каждой строке, первые DECK_SIZE - колода
+    order = np.argsort(generator.random((count, len(pool))), axis=1)[:, :DECK_SIZE]
+    return pool[order]
+
+
+class Zone(list):
+    """рука или стол: список не больше capacity карт, меняется только на месте"""
+
+    __slots__ = ("capacity",)
+
+    def __init__(self, capacity):
+        super().__init__()
+        self.capacity = capacity
+
+    def is_full(self):
+        """заняты ли все места"""
+        return len(self) >= self.capacity
+
+    def append(self, card):
+        """карта в конец зоны, False если мест нет"""
+        if len(self) >= self.capacity:
+            return False
+        list.append(self, card)
+        return True
+
+    def copy(self):
+        """копия зоны с копиями карт"""
+        zone = Zone(self.capacity)
+        list.extend(zone, [card.copy() for card in self])
+        return zone
+
+    def remove_dead(self, removed=None):
+        """уплотнение на месте: живые сдвигаются к началу, возвращает число убранных"""
+        #в removed пишутся (зона, индекс, карта) убранных, чтобы их можно было вернуть
+        alive = 0
+        for i, card in enumerate(self):
+            if card.health > 0:
+                self[alive] = card
+                alive += 1
+            elif removed is not None:
+                removed.append((self, i, card))
+        dead = len(self) - alive
+        if dead:
+            del self[alive:]
+        return dead
+
+
+class PlayerState:
+    """игрок без отрисовки: здоровье, мана, колода, рука и стол"""
+
+    def __init__(self, name, is_human=True, card_class=CardState, deck=None, seed=None):
+        self.name = name
+        self.is_human = is_human
+        #класс копий карт: CardState без отрисовки или Card для экрана
+        self.card_class = card_class
+        self.health = 30
+        self.max_health = 30
+        self.mana = 1
+        self.max_mana = 1
+        #колода берётся с начала за O(1), рука и стол - массивы на 7 мест
+        self.deck = deque(deck if deck is not None else create_random_deck(seed))
+        self.hand = Zone(HAND_LIMIT)
+        self.board = Zone(BOARD_LIMIT)
+
+        #Начальная Рука
+        for _ in range(3):
+            self.draw_card()
+
+    def clone(self):
+        """копия без отрисовки: числа, шаблоны колоды и копии карт"""
+        player = PlayerState.__new__(PlayerState)
+        player.name = self.name
+        player.is_human = self.is_human
+        player.card_class = CardState
+        player.health = self.health
+        player.max_health = self.max_health
+        player.mana = self.mana
+        player.max_mana = self.max_mana
+        player.deck = deque(self.deck)
+        player.hand = self.hand.copy()
+        player.board = self.board.copy()
+        return player
+
+    def draw_card(self):
+        """Получение карты из колоды в руку"""
+        if self.deck and not self.hand.is_full():
+            card = self.card_class(self.deck.popleft())
+            self.hand.append(card)
+            return card
+        return None
+
+    def play_card(self, card_index, target=None):
+        """Сыграть карту из руки"""
+        if card_index >= len(self.hand):
+            return False
+
+        card = self.hand[card_index]
+
+        #Проверка на наличие достаточного кол-ва маны
+        if card.cost > self.mana:
+            return False
+
+        #Проверка на свободное место
+        if card.card_type == CardType.MINION and self.board.is_full():
+            return False
+
+        #Трата маны
+        self.mana -= card.cost
+
+        #Убирание карты из руки
+        self.hand.pop(card_index)
+
+        #свойства разных тип карт
+        if card.card_type == CardType.MINION:
+            #Размещение существа
+            card.summoning_sickness = True  #не может атаковать в этот ход
+            self.board.append(card)
+            return True
+        elif card.card_type == CardType.SPELL:
+            #Использование заклинаний
+            if target:
+                self.cast_spell(card, target)
+            return True
+
+        return False
+
+    def start_turn(self):
+        """начало хода"""
+        if self.max_mana < 10:
+            self.max_mana += 1
+
+        self.mana = self.max_mana
+
+        #взятие карты
+        self.draw_card()
+
+        #чистка мёртвых существа
+        self.board.remove_dead()
+        for minion in self.board:
+            minion.reset_turn()
+
+    def end_turn(self):
+        """конец хода"""
+        pass
+
+    def take_damage(self, damage):
+        """получение урона"""
+        self.health -= damage
+        return self.health <= 0
+
+    def heal(self, amount):
+        """восстановление здоровья"""
+        self.health = min(self.max_health, self.health + amount)
+
+    def cast_spell(self, spell_card, target):
+        """Свойства заклинаний: обработчик по коду эффекта шаблона"""
+        op, a, b = spell_card.template.effect
+        EFFECTS[op](target, a, b)
+
+    def attack_with_minion(self, minion_index, target):
+        """Атака существом"""
+        if minion_index >= len(self.board):
+            return False
+
+        #мёртвых убирает GameState.resolve_deaths, один раз за действие
+        return self.board[minion_index].attack_target(target)
+
+    def remove_dead_minions(self, removed=None):
+        """чистка существа с доски"""
+        return self.board.remove_dead(removed)
+
+
+def affordable_mask(hand, mana):
+    """биты карт руки, на которые хватает маны"""
+    mask = 0
+    for i, card in enumerate(hand):
+        if card.template.cost <= mana:
+            mask |= 1 << i
+    return mask
+
+
+def ready_mask(board):
+    """биты существ, которые могут атаковать"""
+    mask = 0
+    for i, minion in enumerate(board):
+        #на столе только существа, остальное как в can_attack_target
+        if not minion.has_attacked and not minion.summoning_sickness and minion.attack > 0:
+            mask |= 1 << i
+    return mask
+
+
+#ключи Zobrist по признакам позиции, заводятся при первом появлении признака
+_ZOBRIST = {}
+
+
+def zobrist_key(*fields):
+    """64-битный ключ признака, выводится из самих полей и одинаков в любом процессе"""
+    key = _ZOBRIST.get(fields)
+    if key is None:
+        digest = hashlib.blake2b(repr(fields).encode("utf-8"), digest_size=8).digest()
+        key = int.from_bytes(digest, "little")
+        _ZOBRIST[fields] = key
+    return key
+
+
+def hero_hash(side, player):
+    """ключ героя: здоровье и мана"""
+    fields = (side, player.health, player.mana, player.max_mana)
+    key = _ZOBRIST.get(fields)
+    return key if key is not None else zobrist_key(*fields)
+
+
+def zone_hash(side, zone_code, zone, start=0):
+    """ключи мест зоны начиная со start: шаблон, атака, здоровье и усталость карты"""
+    key = 0
+    for i in range(start, len(zone)):
+        card = zone[i]
+        fields = (side, zone_code, i, card.template.id, card.attack, card.health,
+                  card.has_attacked or card.summoning_sickness)
+        #готовый ключ берётся прямо из словаря, без вызова
+        field_key = _ZOBRIST.get(fields)
+        if field_key is None:
+            field_key = zobrist_key(*fields)
+        key ^= field_key
+    return key
+
+
+class GameState:
+    """партия без отрисовки: два игрока, очередь хода и победитель"""
+
+    def __init__(self, player1=None, player2=None, seed=None, record=True):
+        #один генератор на обе колоды: сид целиком задаёт партию
+        self.seed = seed
+        rng = make_rng(seed)
+        self.player1 = player1 if player1 is not None else PlayerState("Игрок 1", seed=rng)
+        self.player2 = player2 if player2 is not None else PlayerState("Игрок 2", seed=rng)
+        self.current_player = self.player1
+        self.other_player = self.player2
+        self.turn_number = 1
+        self.winner = None
+
+        #существа, умершие в текущем действии
+        self.pending_deaths = []
+
+        #маски ходящего: карты руки по карману и существа, готовые к атаке
+        self.affordable = 0
+        self.ready = 0
+        self.update_masks()
+
+        #журнал отката: на каждое действие кортеж с тем, что оно поменяло
+        #None - не вести, доигрываниям без отката он только мешает
+        self.log = [] if record else None
+
+        #коды сделанных действий: вместе с сидом по ним партия повторяется
+        self.actions = array("H") if record else None
+
+        #хэш позиции ведётся вместе с журналом
+        self.hash = self.compute_hash() if record else None
+
+    def update_masks(self):
+        """маски ходящего с нуля"""
+        player = self.current_player
+        self.affordable = affordable_mask(player.hand, player.mana)
+        self.ready = ready_mask(player.board)
+
+    def can_attack(self, minion_index):
+        """может ли существо ходящего атаковать"""
+        return bool(self.ready >> minion_index & 1)
+
+    def legal_actions(self):
+        """все допустимые действия ходящего кодами encode_action, конец хода последним"""
+        if self.winner is not None:
+            return []
+        player = self.current_player
+        hand = player.hand
+        own_count = len(player.board)
+        enemy_count = len(self.other_player.board)
+        codes = []
+
+        for i in MASK_BITS[self.affordable]:
+            targets = hand[i].template.targets
+            if targets != TARGETS_NONE or own_count < BOARD_LIMIT:
+                codes += PLAY_CODES[targets][i][own_count][enemy_count]
+
+        for i in MASK_BITS[self.ready]:
+            codes += ATTACK_CODES[i][enemy_count]
+
+        codes.append(END_TURN_CODE)
+        return codes
+
+    def side(self):
+        """0 если ходит первый игрок, 1 если второй"""
+        return 0 if self.current_player is self.player1 else 1
+
+    def compute_hash(self):
+        """хэш позиции с нуля: герои, рука и стол обоих игроков, чей ход"""
+        key = zobrist_key("side") if self.current_player is self.player2 else 0
+        for side, player in enumerate((self.player1, self.player2)):
+            key ^= hero_hash(side, player)
+            key ^= zone_hash(side, HAND_ZONE, player.hand)
+            key ^= zone_hash(side, BOARD_ZONE, player.board)
+        return key
+
+    def region_hash(self, hand_from, own_from, enemy_from):
+        """ключи всего, что может поменять одно действие: герои и хвосты зон с указанных мест"""
+        player = self.current_player
+        enemy = self.other_player
+        side = 0 if player is self.player1 else 1
+        key = hero_hash(side, player) ^ hero_hash(1 - side, enemy)
+        #пустые хвосты не считаются вовсе
+        if hand_from < len(player.hand):
+            key ^= zone_hash(side, HAND_ZONE, player.hand, hand_from)
+        if own_from < len(player.board):
+            key ^= zone_hash(side, BOARD_ZONE, player.board, own_from)
+        if enemy_from < len(enemy.board):
+            key ^= zone_hash(1 - side, BOARD_ZONE, enemy.board, enemy_from)
+        return key
+
+    def touched_slots(self, target):
+        """с каких мест своего и чужого стола действие на цель target может что-то поменять"""
+        own_from = len(self.current_player.board)
+        enemy_from = len(self.other_player.board)
+        if TARGET_OWN_MINION <= target:
+            own_from = target - TARGET_OWN_MINION
+        elif TARGET_ENEMY_MINION <= target:
+            enemy_from = target - TARGET_ENEMY_MINION
+        return own_from, enemy_from
+
+    def clone(self, record=True):
+        """независимая копия партии без отрисовки, журнал у копии свой и пустой"""
+        state = GameState.__new__(GameState)
+        state.seed = self.seed
+        state.player1 = self.player1.clone()
+        state.player2 = self.player2.clone()
+        if self.current_player is self.player1:
+            state.current_player, state.other_player = state.player1, state.player2
+        else:
+            state.current_player, state.other_player = state.player2, state.player1
+        state.turn_number = self.turn_number
+        state.winner = None
+        if self.winner is self.player1:
+            state.winner = state.player1
+        elif self.winner is self.player2:
+            state.winner = state.player2
+        state.pending_deaths = []
+        state.affordable = self.affordable
+        state.ready = self.ready
+        state.log = [] if record else None
+        state.actions = array("H") if record else None
+        state.hash = None
+        if record:
+            state.hash = self.hash if self.hash is not None else state.compute_hash()
+        return state
+
+    def resolve_target(self, target):
+        """объект цели по её коду, None если цели нет"""
+        if target == TARGET_ENEMY_HERO:
+            return self.other_player
+        if target == TARGET_OWN_HERO:
+            return self.current_player
+        if TARGET_ENEMY_MINION <= target < TARGET_OWN_MINION:
+            board = self.other_player.board
+            index = target - TARGET_ENEMY_MINION
+        elif TARGET_OWN_MINION <= target < TARGET_OWN_MINION + BOARD_LIMIT:
+            board = self.current_player.board
+            index = target - TARGET_OWN_MINION
+        else:
+            return None
+        return board[index] if index < len(board) else None
+
+    def target_code(self, target):
+        """код цели по объекту, обратное к resolve_target"""
+        if target is None:
+            return TARGET_NONE
+        if target is self.other_player:
+            return TARGET_ENEMY_HERO
+        if target is self.current_player:
+            return TARGET_OWN_HERO
+        for i, minion in enumerate(self.other_player.board):
+            if minion is target:
+                return TARGET_ENEMY_MINION + i
+        for i, minion in enumerate(self.current_player.board):
+            if minion is target:
+                return TARGET_OWN_MINION + i
+        return TARGET_NONE
+
+    def play_card(self, card_index, target=TARGET_NONE):
+        """розыгрыш карты из руки текущего игрока"""
+        if self.winner is not None:
+            return False
+        player = self.current_player
+        if card_index >= len(player.hand) or not TARGET_NONE <= target < TARGET_OWN_MINION + BOARD_LIMIT:
+            return False
+        target_obj = self.resolve_target(target)
+        #цель из класса целей карты и существует: те же действия, что в legal_actions, и хэш по верной области
+        if not VALID_TARGETS[player.hand[card_index].template.targets][target + 1] or (
+                target != TARGET_NONE and target_obj is None):
+            return False
+
+        #что розыгрыш может поменять
+        log = self.log
+        if log is not None:
+            card = player.hand[card_index]
+            mana = player.mana
+            target_stats = self.capture(target_obj)
+            key = self.hash
+            own_from, enemy_from = self.touched_slots(target)
+            region = self.region_hash(card_index, own_from, enemy_from)
+
+        if not player.play_card(card_index, target_obj):
+            return False
+        self.queue_death(target_obj)
+        deaths = self.resolve_deaths()
+
+        #мана потрачена - карман пересчитывается, своё существо-цель могло умереть или получить атаку
+        self.affordable = affordable_mask(player.hand, player.mana)
+        if target >= TARGET_OWN_MINION and target_obj is not None:
+            minion_index = target - TARGET_OWN_MINION
+            if target_obj.health <= 0:
+                self.ready = drop_bit(self.ready, minion_index)
+            elif target_obj.can_attack_target():
+                self.ready |= 1 << minion_index
+        if log is not None:
+            self.hash ^= region ^ self.region_hash(card_index, own_from, enemy_from)
+            log.append((PLAY_CARD, key, card_index, card, mana, target_obj, target_stats, deaths))
+            self.actions.append(encode_action(PLAY_CARD, card_index, target))
+        return True
+
+    def attack(self, minion_index, target):
+        """атака существом текущего игрока"""
+        if self.winner is not None:
+            return False
+        #атаковать можно только героя и существ соперника
+        if not TARGET_ENEMY_HERO <= target < TARGET_OWN_MINION or target == TARGET_OWN_HERO:
+            return False
+        target_obj = self.resolve_target(target)
+        if target_obj is None or minion_index >= len(self.current_player.board):
+            return False
+        minion = self.current_player.board[minion_index]
+
+        #что атака может поменять
+        log = self.log
+        if log is not None:
+            minion_health = minion.health
+            has_attacked = minion.has_attacked
+            target_stats = self.capture(target_obj)
+            key = self.hash
+            enemy_from = self.touched_slots(target)[1]
+            hand_size = len(self.current_player.hand)
+            region = self.region_hash(hand_size, minion_index, enemy_from)
+
+        if not self.current_player.attack_with_minion(minion_index, target_obj):
+            return False
+        self.queue_death(minion)
+        self.queue_death(target_obj)
+        deaths = self.resolve_deaths()
+
+        #атаковавшее существо устало, погибшее уходит из маски
+        ready = self.ready & ~(1 << minion_index)
+        if minion.health <= 0:
+            ready = drop_bit(ready, minion_index)
+        self.ready = ready
+        if log is not None:
+            #рука атакой не меняется и в хэш действия не входит
+            self.hash ^= region ^ self.region_hash(hand_size, minion_index, enemy_from)
+            log.append((ATTACK, key, minion, minion_health, has_attacked, target_obj, target_stats, deaths))
+            self.actions.append(encode_action(ATTACK, minion_index, target))
+        return True
+
+    def end_turn(self):
+        """передача хода сопернику"""
+        if self.winner is not None:
+            return False
+        self.current_player.end_turn()
+        self.current_player, self.other_player = self.other_player, self.current_player
+        player = self.current_player
+        if self.log is None:
+            player.start_turn()
+            self.turn_number += 1
+            self.update_masks()
+            return True
+
+        #мана и флаги существ нового игрока до начала хода, мёртвых на столе нет
+        key = self.hash
+        max_mana = player.max_mana
+        mana = player.mana
+        hand_size = len(player.hand)
+        flags = [(minion.can_attack, minion.has_attacked, minion.summoning_sickness) for minion in player.board]
+        enemy_size = len(self.other_player.board)
+        region = self.region_hash(hand_size, 0, enemy_size)
+
+        player.start_turn()
+        self.turn_number += 1
+        self.update_masks()
+        drawn = player.hand[-1] if len(player.hand) > hand_size else None
+        self.hash ^= region ^ self.region_hash(hand_size, 0, enemy_size) ^ zobrist_key("side")
+        self.log.append((END_TURN, key, max_mana, mana, drawn, flags))
+        self.actions.append(END_TURN_CODE)
+        return True
+
+    def undo(self):
+        """откат последнего действия из журнала, False если откатывать нечего"""
+        if not self.log:
+            return False
+        entry = self.log.pop()
+        self.actions.pop()
+        kind = entry[0]
+        #хэш до действия лежит в записи
+        self.hash = entry[1]
+        #действия делаются только в незаконченной партии
+        self.winner = None
+
+        if kind == PLAY_CARD:
+            _, _, card_index, card, mana, target, target_stats, deaths = entry
+            player = self.current_player
+            self.restore_deaths(deaths)
+            if card.card_type == CardType.MINION:
+                #сыгранное существо - последнее на столе
+                player.board.pop()
+            self.restore(target, target_stats)
+            player.hand.insert(card_index, card)
+            player.mana = mana
+
+        elif kind == ATTACK:
+            _, _, minion, minion_health, has_attacked, target, target_stats, deaths = entry
+            self.restore_deaths(deaths)
+            minion.health = minion_health
+            minion.has_attacked = has_attacked
+            self.restore(target, target_stats)
+
+        elif kind == END_TURN:
+            _, _, max_mana, mana, drawn, flags = entry
+            player = self.current_player
+            if drawn is not None:
+                player.hand.pop()
+                player.deck.appendleft(drawn.template)
+            for minion, (can_attack, has_attacked, summoning_sickness) in zip(player.board, flags):
+                minion.can_attack = can_attack
+                minion.has_attacked = has_attacked
+                minion.summoning_sickness = summoning_sickness
+            player.max_mana = max_mana
+            player.mana = mana
+            self.current_player, self.other_player = self.other_player, self.current_player
+            self.turn_number -= 1
+
+        self.update_masks()
+        return True
+
+    def capture(self, target):
+        """статы цели, которые может поменять действие"""
+        if isinstance(target, CardState):
+            return target.attack, target.health
+        if target is not None:
+            return target.health
+        return None
+
+    def restore(self, target, stats):
+        """возврат статов цели из capture"""
+        if isinstance(target, CardState):
+            target.attack, target.health = stats
+        elif target is not None:
+            target.health = stats
+
+    def restore_deaths(self, deaths):
+        """возврат убранных существ на их места"""
+        if deaths:
+            #по возрастанию индекса каждая вставка встаёт на своё старое место
+            for zone, index, card in deaths:
+                list.insert(zone, index, card)
+
+    def apply_code(self, code):
+        """применение действия по коду encode_action"""
+        kind = code >> 8
+        if kind == PLAY_CARD:
+            return self.play_card(code >> 5 & 7, (code & 31) - 1)
+        if kind == ATTACK:
+            return self.attack(code >> 5 & 7, (code & 31) - 1)
+        if kind == END_TURN:
+            return self.end_turn()
+        return False
+
+    def apply(self, action):
+        """применение действия, False если оно невозможно"""
+        kind, index, target = action
+        if kind == PLAY_CARD:
+            return self.play_card(index, target)
+        if kind == ATTACK:
+            return self.attack(index, target)
+        if kind == END_TURN:
+            return self.end_turn()
+        return False
+
+    def queue_death(self, target):
+        """в очередь на уборку, если цель - погибшее существо"""
+        if isinstance(target, CardState) and target.health <= 0:
+            self.pending_deaths.append(target)
+
+    def resolve_deaths(self):
+        """уборка погибших за действие существ и проверка конца игры, возвращает убранных"""
+        deaths = None
+        if self.pending_deaths:
+            #стол уплотняется на месте один раз, сколько бы существ ни умерло
+            if self.log is not None:
+                deaths = []
+            self.current_player.remove_dead_minions(deaths)
+            self.other_player.remove_dead_minions(deaths)
+            self.pending_deaths.clear()
+        self.check_winner()
+        return deaths
+
+    def check_winner(self):
+        """победитель, если у кого-то кончилось здоровье"""
+        if self.player1.health <= 0:
+            self.winner = self.player2
+        elif self.player2.health <= 0:
+            self.winner = self.player1
+        return self.winner
+
+    def is_over(self):
+        """закончена ли партия"""
+        return self.winner is not None
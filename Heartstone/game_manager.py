@@ -1,24 +1,53 @@
 import pygame
 import math
+import random
 from player import Player
-from card import CardType
+from card import Card, CardType
+from engine import GameState, END_TURN, EFFECT_DAMAGE, make_rng
+from ai import AIPlayer
+from replay import ReplayDriver, save_match
+from layout import Layout, row_xs
 import os
+import time
+from assets import get_font, render_text, textures, loader
+
+MUSIC_PATH = "Heartstone/assets/Linkin Park — In the End.mp3"
+BACKGROUND_PATH = "Heartstone/assets/table/backgrount.jpg"
+PHOTO_PATH = "Heartstone/assets/switch.jpg"
 
 class GameManager:
-    def __init__(self, screen):
+    def __init__(self, screen, dirty_rects=False, vs_ai=False, ai_budget=0.5, replay=None, replay_speed=1.0, ai_stats=False):
+        self.startup_started = time.perf_counter()
         self.screen = screen
         self.screen_width = screen.get_width()
         self.screen_height = screen.get_height()
+
+        #где что лежит на столе: одно и то же для отрисовки и для кликов
+        self.layout = Layout(self.screen_width, self.screen_height)
+
+        #отрисовка только изменившихся областей
+        self.dirty_rects_enabled = dirty_rects
+        self.dirty_rects = []
+        self.last_scene = None
         
         #инциализация аудио
         pygame.mixer.init()
         self.init_background_music()
         
-        #инциализация игроков
-        self.player1 = Player("Игрок 1", True)
-        self.player2 = Player("Игрок 2", True)
-        self.current_player = self.player1
-        self.other_player = self.player2
+        #компьютер играет за второго игрока, думает в отдельном процессе
+        self.vs_ai = vs_ai
+        self.ai = AIPlayer(ai_budget) if vs_ai else None
+        #статистика поиска в консоль после каждого хода, иначе только в self.ai.last_stats
+        self.ai_stats = ai_stats
+        
+        #просмотр записи: ходы за обоих игроков берутся из неё
+        self.replay = replay
+        if replay is not None:
+            self.ai = ReplayDriver(replay, replay_speed)
+        self.replay_saved = False
+        
+        #инциализация игроков, правила живут в engine.GameState
+        self.state = self.create_game_state()
         
         #статус игры
         self.game_over = False
@@ -26,7 +55,6 @@ class GameManager:
         self.selected_card_index = -1
         self.selected_minion_index = -1
         self.attack_mode = False
-        self.turn_number = 1
         self.show_help = False
         self.show_menu = False
         self.menu_selected_option = 0
@@ -44,6 +72,7 @@ class GameManager:
         self.collection_scroll_offset = 0
         self.collection_card_size = (120, 160)
         self.selected_collection_card = 0
+        self.collection_entries = {}
         
         #перетаскивание и использования карт из руки
         self.dragging = False
@@ -55,7 +84,8 @@ class GameManager:
         #флип стола
         self.table_flip_active = False
         self.flip_progress = 0.0
-        self.flip_speed = 3.0
+        self.flip_speed = 3.0 * (replay_speed if replay is not None else 1.0)
+        self.flip_snapshots = None
         
         #оверлей картинок
         self.show_photo = False
@@ -65,62 +95,128 @@ class GameManager:
         self.background_image = None
         self.background_loaded = False
         
+        #готовые слои оверлеев
+        self.overlay_layers = {}
+        self.dim_surfaces = {}
+        
         #фонт
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+        self.font = get_font(36)
+        self.small_font = get_font(24)
+        
+        #загрузка ассетов в фоне
+        self.loading = False
+        self.preload_assets()
+    
+    @property
+    def player1(self):
+        """игрок 1 из состояния партии"""
+        return self.state.player1
+    
+    @property
+    def player2(self):
+        """игрок 2 из состояния партии"""
+        return self.state.player2
+    
+    @property
+    def current_player(self):
+        """игрок, который сейчас ходит"""
+        return self.state.current_player
+    
+    @property
+    def other_player(self):
+        """соперник текущего игрока"""
+        return self.state.other_player
+    
+    @property
+    def turn_number(self):
+        """номер хода"""
+        return self.state.turn_number
+    
+    def current_layout(self):
+        """геометрия стола под текущие зоны"""
+        return self.layout.update(len(self.current_player.hand), len(self.current_player.board),
+                                  len(self.other_player.board))
+    
+    def create_game_state(self):
+        """новая партия, второй игрок - компьютер если он включён"""
+        #колоды из сида партии, как у GameState(seed=...) без интерфейса: по нему партию можно повторить
+        seed = self.replay.seed if self.replay is not None else random.getrandbits(32)
+        rng = make_rng(seed)
+        if self.replay is not None:
+            return GameState(Player("Игрок 1", False, seed=rng), Player("Игрок 2", False, seed=rng), seed=seed)
+        if self.vs_ai:
+            return GameState(Player("Игрок 1", True, seed=rng), Player("Компьютер", False, seed=rng), seed=seed)
+        return GameState(Player("Игрок 1", True, seed=rng), Player("Игрок 2", True, seed=rng), seed=seed)
     
     def init_background_music(self):
         """Музыка"""
+        if not os.path.exists(MUSIC_PATH):
+            return
+        
         try:
-            # Try to load background music from assets folder
-            music_files = "Heartstone/assets/Linkin Park — In the End.mp3"
-            
-            music_loaded = False
-            for music_file in music_files:
-                if os.path.exists(music_file):
-                    try:
-                        pygame.mixer.music.load("Heartstone/assets/Linkin Park — In the End.mp3")
-                        pygame.mixer.music.set_volume(0.3)
-                        pygame.mixer.music.play(-1)  #бесконечная лупа
-                        print(f"Background music loaded: {"Heartstone/assets/Linkin Park — In the End.mp3"}")
-                        music_loaded = True
-                        break
-                    
-                    except pygame.error as e:
-                        print(f"Could not load {"Heartstone/assets/Linkin Park — In the End.mp3"}: {e}")
-                        continue
-            
+            pygame.mixer.music.load(MUSIC_PATH)
+            pygame.mixer.music.set_volume(0.3)
+            pygame.mixer.music.play(-1)  #бесконечная лупа
+            print(f"Background music loaded: {MUSIC_PATH}")
         except pygame.error as e:
-            print(f"Could not initialize background music: {e}")
+            print(f"Could not load {MUSIC_PATH}: {e}")
 
     def load_background_image(self):
         """отрисовка поля"""
         if self.background_loaded:
             return
         
-        try:
-            background_files = "Heartstone/assets/table/backgrount.jpg"
-            
-            for bg_file in background_files:
-                if os.path.exists("Heartstone/assets/table/backgrount.jpg"):
-                    try:
-                        self.background_image = pygame.image.load("Heartstone/assets/table/backgrount.jpg")
-                        #скейл для приятности глазу
-                        self.background_image = pygame.transform.smoothscale(
-                            self.background_image, 
-                            (self.screen_width, self.screen_height)
-                        )
-                        print(f"Background image loaded: {"Heartstone/assets/table/backgrount.jpg"}")
-                        break
-                    
-                    except pygame.error as e:
-                        print(f"Could not load {"Heartstone/assets/table/backgrount.jpg"}: {e}")
-                        continue
-
-        except Exception as e:
-            print(f"Could not initialize background image: {e}")
+        #скейл для приятности глазу
+        size = (self.screen_width, self.screen_height)
+        self.background_image = textures.get(BACKGROUND_PATH, size, smooth=True)
+        self.background_loaded = not textures.is_pending(BACKGROUND_PATH, size, smooth=True)
+    
+    def preload_assets(self):
+        """фоновый декод всех картинок карт, стола и оверлеев"""
+        from card import CARD_DATABASE
+        
+        for card_template in CARD_DATABASE:
+            loader.request_texture(card_template.image_path, (120, 160))
+            loader.request_texture(card_template.cost_icon_path, (28, 28), alpha=True)
+            loader.request_texture(card_template.attack_icon_path, (24, 24), alpha=True)
+            loader.request_texture(card_template.health_icon_path, (24, 24), alpha=True)
+            loader.request_texture(card_template.spell_icon_path, (24, 24), alpha=True)
+        
+        loader.request_texture(BACKGROUND_PATH, (self.screen_width, self.screen_height), smooth=True)
+        self.start_photo_preload()
+        self.loading = not loader.is_done()
+    
+    def finish_loading(self):
+        """конец загрузки: отчёт о времени старта"""
+        self.loading = False
+        self.mark_dirty()
+        startup_time = time.perf_counter() - self.startup_started
+        print(f"Startup finished in {startup_time:.2f} s ({loader.completed} assets, decode {loader.elapsed:.2f} s)")
+    
+    def draw_loading_screen(self):
+        """экран загрузки с прогрессом"""
+        self.screen.fill((0, 0, 0))
+        
+        title_text = render_text(get_font(48), "Загрузка...", (255, 255, 255))
+        title_rect = title_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 40))
+        self.screen.blit(title_text, title_rect)
         
-        self.background_loaded = True
+        #полоска прогресса
+        bar_width = 400
+        bar_height = 20
+        bar_x = (self.screen_width - bar_width) // 2
+        bar_y = self.screen_height // 2
+        progress = loader.progress()
+        
+        background_rect = pygame.Rect(bar_x, bar_y, bar_width, bar_height)
+        pygame.draw.rect(self.screen, (100, 100, 100), background_rect)
+        if progress > 0:
+            pygame.draw.rect(self.screen, (100, 150, 255), (bar_x, bar_y, int(bar_width * progress), bar_height))
+        pygame.draw.rect(self.screen, (255, 255, 255), background_rect, 2)
+        
+        percent_text = render_text(self.small_font, f"{int(progress * 100)}%", (255, 255, 255))
+        percent_rect = percent_text.get_rect(center=(self.screen_width // 2, bar_y + 40))
+        self.screen.blit(percent_text, percent_rect)
     
     def toggle_music(self):
         """включение и выключение музыки на кнопку"""
@@ -148,8 +244,8 @@ class GameManager:
         elif selected == "Настройки":
             self.show_settings = True
         elif selected == "Выйти":
-            pygame.quit()
-            exit()
+            #выход через главный цикл, чтобы shutdown сохранил запись и остановил компьютер
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
     
     def handle_menu_mouse_click(self, pos):
         """кнопки в меню нажимаются мышкой"""
@@ -198,6 +294,12 @@ class GameManager:
                 break
     
     def handle_event(self, event):
+        #окно перекрыли или развернули - нужен полный кадр
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.mark_dirty()
+            return
+        if self.loading:
+            return
         if self.game_over:
             self.handle_game_over_event(event)
             return
@@ -240,6 +342,9 @@ class GameManager:
             #блокировка оверлея при открытом меню
             elif self.show_help or self.show_menu or self.show_settings or self.show_card_collection:
                 return
+            #ход компьютера - работают только музыка и коллекция
+            elif self.is_ai_turn() and event.key not in (pygame.K_m, pygame.K_c):
+                return
             #SPACE переворот экрана
             elif event.key == pygame.K_SPACE:
                 if not self.space_pressed_once:
@@ -279,7 +384,8 @@ class GameManager:
                 elif self.show_card_collection:
                     self.handle_card_collection_mouse_click(event.pos)
                 elif not (self.show_help or self.show_photo):
-                    self.handle_mouse_down(event.pos)
+                    if not self.is_ai_turn():
+                        self.handle_mouse_down(event.pos)
                     #проверка на клик коллекции карт
                     self.handle_card_collection_button_click(event.pos)
         elif event.type == pygame.MOUSEBUTTONUP:
@@ -305,24 +411,19 @@ class GameManager:
     def handle_mouse_down(self, pos):
         """нажатие на мышку"""
         #проверка на нажатие на карту для её перемещения
-        hand_y = self.screen_height - 180
-        hand_width = len(self.current_player.hand) * 130
-        start_x = (self.screen_width - hand_width) // 2
-        
-        for i, card in enumerate(self.current_player.hand):
-            card_x = start_x + i * 130
-            card_rect = pygame.Rect(card_x, hand_y, 120, 160)
-            if card_rect.collidepoint(pos):
-                #начало перемещения карты
-                self.dragging = True
-                self.dragged_card_index = i
-                self.drag_start_pos = pos
-                self.drag_current_pos = pos
-                self.drag_offset = (pos[0] - card_x, pos[1] - hand_y)
-                self.selected_card_index = i
-                self.selected_minion_index = -1
-                self.attack_mode = False
-                return
+        hand = self.current_layout().hand
+        i = hand.at(pos)
+        if i >= 0:
+            #начало перемещения карты
+            self.dragging = True
+            self.dragged_card_index = i
+            self.drag_start_pos = pos
+            self.drag_current_pos = pos
+            self.drag_offset = (pos[0] - hand.xs[i], pos[1] - hand.y)
+            self.selected_card_index = i
+            self.selected_minion_index = -1
+            self.attack_mode = False
+            return
         
         #если не зажата, прост клик
         self.handle_mouse_click(pos)
@@ -348,138 +449,91 @@ class GameManager:
             return
         
         card = self.current_player.hand[self.dragged_card_index]
+        layout = self.current_layout()
         
         #проверка на кого поставлена карта
-        current_face_rect = pygame.Rect(10, self.screen_height - 120, 200, 100)
-        if current_face_rect.collidepoint(pos):
+        if layout.own_hero.collidepoint(pos):
             if card.card_type == CardType.SPELL:
-                if self.current_player.play_card(self.dragged_card_index, self.current_player):
-                    self.selected_card_index = -1
-                    self.cleanup_dead_minions()
-                    self.check_game_over()
+                self.play_card(self.dragged_card_index, self.current_player)
             return
         
         #проверка на то, убрал ли карту обратно в круку
-        hand_y = self.screen_height - 180
-        hand_zone = pygame.Rect(0, hand_y - 20, self.screen_width, 200)
-        if hand_zone.collidepoint(pos):
+        if layout.hand_zone.collidepoint(pos):
             #отпуск карты обратно в руку
             self.selected_card_index = -1
             return
         
         #проверка на дроп в зону стола
-        board_drop_zone = pygame.Rect(0, self.screen_height - 400, self.screen_width, 200)
-        if board_drop_zone.collidepoint(pos) and card.card_type == CardType.MINION:
+        if layout.board_zone.collidepoint(pos) and card.card_type == CardType.MINION:
             #сыгрывание карты существа
-            if self.current_player.play_card(self.dragged_card_index):
-                self.selected_card_index = -1
-                self.cleanup_dead_minions()
-                self.check_game_over()
+            self.play_card(self.dragged_card_index)
             return
         
         #проверка на цель в виде соперника и его существ для атаки заклинаниями и существами
-        opponent_face_rect = pygame.Rect(10, 10, 200, 100)
-        if opponent_face_rect.collidepoint(pos):
+        if layout.enemy_hero.collidepoint(pos):
             if card.card_type == CardType.SPELL:
-                if self.current_player.play_card(self.dragged_card_index, self.other_player):
-                    self.selected_card_index = -1
-                    self.cleanup_dead_minions()
-                    self.check_game_over()
+                self.play_card(self.dragged_card_index, self.other_player)
             elif card.card_type == CardType.MINION:
                 #прямая атака на соперника
-                if self.current_player.play_card(self.dragged_card_index):
-                    self.selected_card_index = -1
-                    self.cleanup_dead_minions()
-                    self.check_game_over()
+                self.play_card(self.dragged_card_index)
             return
         
         #проверка на дроп на существо соперника
-        opponent_board_y = 50
-        board_width = len(self.other_player.board) * 130
-        start_x = (self.screen_width - board_width) // 2
-        
-        for i, target_card in enumerate(self.other_player.board):
-            card_x = start_x + i * 130
-            card_rect = pygame.Rect(card_x - 10, opponent_board_y - 10, 140, 180)
-            if card_rect.collidepoint(pos):
-                if card.card_type == CardType.SPELL:
-                    if self.current_player.play_card(self.dragged_card_index, target_card):
-                        self.selected_card_index = -1
-                        self.cleanup_dead_minions()
-                        self.check_game_over()
-                elif card.card_type == CardType.MINION:
-                    if self.current_player.play_card(self.dragged_card_index):
-                        self.selected_card_index = -1
-                        self.cleanup_dead_minions()
-                        self.check_game_over()
-                return
+        i = layout.enemy_drop.at(pos)
+        if i >= 0:
+            if card.card_type == CardType.SPELL:
+                self.play_card(self.dragged_card_index, self.other_player.board[i])
+            elif card.card_type == CardType.MINION:
+                self.play_card(self.dragged_card_index)
+            return
         
         #проверка на цель в виде своих существ
-        current_board_y = self.screen_height - 350
-        board_width = len(self.current_player.board) * 130
-        start_x = (self.screen_width - board_width) // 2
-        
-        for i, target_card in enumerate(self.current_player.board):
-            card_x = start_x + i * 130
-            card_rect = pygame.Rect(card_x - 10, current_board_y - 10, 140, 180)
-            if card_rect.collidepoint(pos):
-                if card.card_type == CardType.SPELL:
-                    if self.current_player.play_card(self.dragged_card_index, target_card):
-                        self.selected_card_index = -1
-                        self.cleanup_dead_minions()
-                        self.check_game_over()
-                return
+        i = layout.board_drop.at(pos)
+        if i >= 0:
+            if card.card_type == CardType.SPELL:
+                self.play_card(self.dragged_card_index, self.current_player.board[i])
+            return
         
         #если ничего из вышеперечисленног - отмена действия
         self.selected_card_index = -1
     
     def handle_mouse_click(self, pos):
         """просто клик на карты"""
+        layout = self.current_layout()
         
-        current_board_y = self.screen_height - 350
-        board_width = len(self.current_player.board) * 130
-        start_x = (self.screen_width - board_width) // 2
-        
-        for i, card in enumerate(self.current_player.board):
-            card_x = start_x + i * 130
-            card_rect = pygame.Rect(card_x, current_board_y, 120, 160)
-            if card_rect.collidepoint(pos):
-                if self.selected_card_index >= 0:
-                    #спелл таргет для дружественных существ
-                    self.play_selected_card(target=card)
-                    return
-                elif card.can_attack_target():
-                    #выбор существа для атаки
-                    if self.selected_minion_index == i and self.attack_mode:
-                        #отмена выбора при нажатии на то же существо
-                        self.selected_minion_index = -1
-                        self.attack_mode = False
-                    else:
-                        self.selected_minion_index = i
-                        self.attack_mode = True
-                        self.selected_card_index = -1
+        i = layout.board.at(pos)
+        if i >= 0:
+            card = self.current_player.board[i]
+            if self.selected_card_index >= 0:
+                #спелл таргет для дружественных существ
+                self.play_selected_card(target=card)
                 return
+            elif self.state.can_attack(i):
+                #выбор существа для атаки
+                if self.selected_minion_index == i and self.attack_mode:
+                    #отмена выбора при нажатии на то же существо
+                    self.selected_minion_index = -1
+                    self.attack_mode = False
+                else:
+                    self.selected_minion_index = i
+                    self.attack_mode = True
+                    self.selected_card_index = -1
+            return
         
         #проверка на клик для доски соперника
-        opponent_board_y = 50
-        board_width = len(self.other_player.board) * 130
-        start_x = (self.screen_width - board_width) // 2
-        
-        for i, card in enumerate(self.other_player.board):
-            card_x = start_x + i * 130
-            card_rect = pygame.Rect(card_x, opponent_board_y, 120, 160)
-            if card_rect.collidepoint(pos):
-                if self.selected_card_index >= 0:
-                    #спелл таргет - вражеское существо
-                    self.play_selected_card(target=card)
-                elif self.attack_mode and self.selected_minion_index >= 0:
-                    #атака на существо
-                    self.attack_target(card)
-                return
+        i = layout.enemy_board.at(pos)
+        if i >= 0:
+            card = self.other_player.board[i]
+            if self.selected_card_index >= 0:
+                #спелл таргет - вражеское существо
+                self.play_selected_card(target=card)
+            elif self.attack_mode and self.selected_minion_index >= 0:
+                #атака на существо
+                self.attack_target(card)
+            return
         
         #проверка на атаку вражеского игрока
-        opponent_face_rect = pygame.Rect(10, 10, 200, 100)
-        if opponent_face_rect.collidepoint(pos):
+        if layout.enemy_hero.collidepoint(pos):
             if self.selected_card_index >= 0:
                 #спелл таргет для вражеского игрока
                 self.play_selected_card(target=self.other_player)
@@ -489,8 +543,7 @@ class GameManager:
             return
         
         #проверка на клик на себя
-        current_face_rect = pygame.Rect(10, self.screen_height - 120, 200, 100)
-        if current_face_rect.collidepoint(pos):
+        if layout.own_hero.collidepoint(pos):
             if self.selected_card_index >= 0:
                 #спелл таргет
                 self.play_selected_card(target=self.current_player)
@@ -507,21 +560,17 @@ class GameManager:
         card = self.current_player.hand[self.selected_card_index]
         
         # выбор атаки спелла прямо на оппонента
-        if card.card_type == CardType.SPELL and not target and card.spell_damage > 0:
+        if card.card_type == CardType.SPELL and not target and card.template.effect[0] == EFFECT_DAMAGE:
             target = self.other_player
         
-        if self.current_player.play_card(self.selected_card_index, target):
-            self.selected_card_index = -1
-            self.cleanup_dead_minions()
-            self.check_game_over()
+        self.play_card(self.selected_card_index, target)
     
     def attack_target(self, target):
         """атака выбранным существом"""
         if self.selected_minion_index < 0 or self.selected_minion_index >= len(self.current_player.board):
             return
         
-        if self.current_player.attack_with_minion(self.selected_minion_index, target):
-            self.cleanup_dead_minions()
+        if self.state.attack(self.selected_minion_index, self.state.target_code(target)):
             self.cancel_selection()
             self.check_game_over()
     
@@ -541,54 +590,210 @@ class GameManager:
         self.selected_minion_index = -1
         self.attack_mode = False
     
-    def cleanup_dead_minions(self):
-        """ремув мёртвых существ"""
-        self.current_player.remove_dead_minions()
-        self.other_player.remove_dead_minions()
+    def play_card(self, card_index, target=None):
+        """розыгрыш карты через движок, target - игрок, существо или None"""
+        #существо ставится на стол, куда бы его ни бросили: цели у него нет
+        if card_index < len(self.current_player.hand) and self.current_player.hand[card_index].card_type == CardType.MINION:
+            target = None
+        if self.state.play_card(card_index, self.state.target_code(target)):
+            self.selected_card_index = -1
+            self.check_game_over()
     
     def end_turn(self):
         """окончание хода и начала флип анимации"""
-        self.current_player.end_turn()
         self.table_flip_active = True
         self.flip_progress = 0.0
+        
+        #стол не меняется во время флипа, хватает двух снимков
+        self.flip_snapshots = (
+            self.capture_flip_snapshot(self.current_player, self.other_player),
+            self.capture_flip_snapshot(self.other_player, self.current_player),
+        )
     
     def complete_turn_switch(self):
         """окончание хода игрока после анимации переворота"""
         #смена игрока
-        self.current_player, self.other_player = self.other_player, self.current_player
-        self.current_player.start_turn()
-        self.turn_number += 1
+        self.state.end_turn()
         self.selected_card_index = -1
         
         #ресет анимаций
         self.table_flip_active = False
         self.flip_progress = 0.0
+        self.flip_snapshots = None
     
     def update(self):
         """обновления состояния игры"""
+        if self.loading:
+            loader.poll()
+            if loader.is_done():
+                self.finish_loading()
+            return
+        
         if self.table_flip_active:
             self.flip_progress += self.flip_speed * (1/60)
             if self.flip_progress >= 1.0:
                 self.complete_turn_switch()
+        else:
+            self.update_ai()
         
         self.check_game_over()
     
+    def is_ai_turn(self):
+        """ходит ли сейчас компьютер"""
+        return self.ai is not None and not self.current_player.is_human and not self.game_over
+    
+    def update_ai(self):
+        """ход компьютера: забрать готовое решение или запустить поиск"""
+        #открытое меню - пауза
+        if not self.is_ai_turn() or self.show_menu:
+            return
+        
+        action = self.ai.poll(self.state)
+        if action is None:
+            return
+        
+        stats = self.ai.last_stats
+        if stats and self.ai_stats:
+            print(f"AI: {stats['playouts']} playouts ({stats['playouts_per_second']:.0f}/s), "
+                  f"depth {stats['max_depth']} (avg {stats['average_depth']:.1f}), win rate {stats['win_rate']:.0%}, "
+                  f"{stats['transpositions']} transpositions, table hit rate {stats['table']['hit_rate']:.0%}")
+        
+        if action.kind == END_TURN or not self.state.apply(action):
+            #конец хода или устаревшее действие - передаём ход
+            self.end_turn()
+        else:
+            self.check_game_over()
+    
+    def shutdown(self):
+        """остановка фоновых процессов"""
+        self.save_replay()
+        if self.ai:
+            self.ai.shutdown()
+    
+    def save_replay(self):
+        """запись партии на диск, один раз за партию"""
+        #без сида партию не повторить
+        if self.replay is not None or self.replay_saved or self.state.seed is None or not self.state.actions:
+            return
+        self.replay_saved = True
+        path = save_match(self.state)
+        if path:
+            print(f"Replay saved to {path}")
+    
+    def is_animating(self):
+        """идёт ли анимация, которой нужен каждый кадр"""
+        #запись кончилась, а партия нет - ждать больше нечего
+        replay_over = self.replay is not None and self.ai.finished()
+        return (self.loading or self.table_flip_active or self.dragging or self.volume_dragging or
+                (self.is_ai_turn() and not self.show_menu and not replay_over))
+    
     def check_game_over(self):
         """проверка на геймовер"""
-        if self.player1.health <= 0:
-            self.game_over = True
-            self.winner = self.player2
-        elif self.player2.health <= 0:
-            self.game_over = True
-            self.winner = self.player1
+        if self.state.check_winner() is not None:
+            if not self.game_over:
+                self.game_over = True
+                self.save_replay()
+            self.winner = self.state.winner
     
     def draw(self):
         """отрисовка игры после флипа"""
-        if self.table_flip_active:
+        if self.loading:
+            self.draw_loading_screen()
+        elif self.table_flip_active:
             self.draw_table_flip()
         else:
             self.draw_normal_game()
-    
+
+    def mark_dirty(self, rect=None):
+        """пометка области на перерисовку, без аргумента - весь экран"""
+        if rect is None:
+            self.last_scene = None
+        else:
+            self.dirty_rects.append(pygame.Rect(rect))
+
+    def card_state(self, card, selected=False):
+        """то, от чего зависит картинка карты"""
+        return (id(card), card.cost, card.attack, card.health, card.border_state(selected))
+
+    def info_state(self, player):
+        """то, от чего зависит инфо игрока"""
+        return (player.name, player.health, player.max_health, player.mana, player.max_mana, len(player.deck))
+
+    def scene_signature(self):
+        """области экрана и их состояние в текущем кадре"""
+        scene = {}
+
+        #оверлеи закрывают весь экран
+        overlay_state = (self.show_help, self.show_menu, self.show_settings, self.menu_selected_option,
+                         self.volume, self.show_card_collection, self.collection_scroll_offset,
+                         self.show_photo, self.game_over, self.game_over_selected_option)
+        scene["overlay"] = (self.screen.get_rect(), overlay_state)
+
+        layout = self.current_layout()
+
+        #стол соперника
+        for i, card in enumerate(self.other_player.board):
+            scene[("other_board", i)] = (layout.enemy_board.rects[i], self.card_state(card))
+
+        #свой стол
+        for i, card in enumerate(self.current_player.board):
+            selected = (self.attack_mode and i == self.selected_minion_index)
+            scene[("board", i)] = (layout.board.rects[i], self.card_state(card, selected))
+
+        #рука
+        for i, card in enumerate(self.current_player.hand):
+            if self.dragging and i == self.dragged_card_index:
+                continue
+            selected = (i == self.selected_card_index and not self.dragging)
+            scene[("hand", i)] = (layout.hand.rects[i], self.card_state(card, selected))
+
+        #инфо игроков
+        scene["other_info"] = (layout.enemy_info, self.info_state(self.other_player))
+        scene["info"] = (layout.own_info, self.info_state(self.current_player))
+
+        #взятая карта
+        if self.dragging and 0 <= self.dragged_card_index < len(self.current_player.hand):
+            card = self.current_player.hand[self.dragged_card_index]
+            draw_x = self.drag_current_pos[0] - self.drag_offset[0]
+            draw_y = self.drag_current_pos[1] - self.drag_offset[1]
+            rect = pygame.Rect(draw_x - 3, draw_y - 3, 126, 166)
+            scene["dragged"] = (rect, self.card_state(card, True))
+
+        return scene
+
+    def draw_dirty(self):
+        """отрисовка только изменившихся областей, возвращает их список"""
+        if self.loading or self.table_flip_active or self.last_scene is None:
+            #загрузка, анимация или первый кадр - весь экран
+            self.draw()
+            self.last_scene = None if self.loading or self.table_flip_active else self.scene_signature()
+            self.dirty_rects = []
+            return [self.screen.get_rect()]
+
+        scene = self.scene_signature()
+        dirty = self.dirty_rects
+        for key in self.last_scene.keys() | scene.keys():
+            old = self.last_scene.get(key)
+            new = scene.get(key)
+            if old == new:
+                continue
+            if old:
+                dirty.append(old[0])
+            if new:
+                dirty.append(new[0])
+
+        self.last_scene = scene
+        self.dirty_rects = []
+        if not dirty:
+            return []
+
+        #перерисовка всей сцены, но только внутри грязных областей
+        clip = dirty[0].unionall(dirty[1:]).clip(self.screen.get_rect())
+        self.screen.set_clip(clip)
+        self.draw_normal_game()
+        self.screen.set_clip(None)
+        return dirty
+
     def draw_normal_game(self):
         """нормал стейт отрисовка"""
         #отрисовка бэкграунда
@@ -597,13 +802,14 @@ class GameManager:
         
         if self.background_image:
             self.screen.blit(self.background_image, (0, 0))
+        layout = self.current_layout()
          #отрисовка оппонента
-        self.other_player.draw_board(self.screen, 50)
+        self.other_player.draw_board(self.screen, layout.enemy_board_y)
         self.draw_player_info_with_highlight(self.other_player, 10, 10, False)
         
         #отрисовка нынешнего игрока
-        self.draw_player_board_with_selection(self.current_player, self.screen_height - 350)
-        self.draw_hand_with_drag(self.current_player, self.screen_height - 180)
+        self.draw_player_board_with_selection(self.current_player, layout.board_y)
+        self.draw_hand_with_drag(self.current_player, layout.hand_y)
         self.draw_player_info_with_highlight(self.current_player, 10, self.screen_height - 120, True)
         #отрисовка взятых карт
         if self.dragging and self.dragged_card_index >= 0:
@@ -633,13 +839,36 @@ class GameManager:
         if self.game_over:
             self.draw_game_over()
     
+    def get_dim_surface(self, alpha):
+        """затемнение экрана под оверлеем"""
+        key = (alpha, self.screen_width, self.screen_height)
+        dim = self.dim_surfaces.get(key)
+        if dim is None:
+            dim = pygame.Surface((self.screen_width, self.screen_height))
+            dim.set_alpha(alpha)
+            dim.fill((0, 0, 0))
+            self.dim_surfaces[key] = dim
+        return dim
+    
+    def draw_overlay_layer(self, name, alpha, key, builder):
+        """оверлей из кэша, пересобирается только при смене содержимого"""
+        key = (key, self.screen_width, self.screen_height)
+        cached = self.overlay_layers.get(name)
+        if cached is None or cached[0] != key:
+            layer = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
+            builder(layer)
+            cached = (key, layer)
+            self.overlay_layers[name] = cached
+        
+        self.screen.blit(self.get_dim_surface(alpha), (0, 0))
+        self.screen.blit(cached[1], (0, 0))
+    
     def draw_help_window(self):
         """отрисовка окна помощи"""
-        overlay = pygame.Surface((self.screen_width, self.screen_height))
-        overlay.set_alpha(180)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-        
+        self.draw_overlay_layer("help", 180, (), self.build_help_layer)
+    
+    def build_help_layer(self, layer):
+        """окно помощи"""
         #вид окна
         window_width = 800
         window_height = 500
@@ -648,14 +877,14 @@ class GameManager:
         
         #бэкграунд
         help_rect = pygame.Rect(window_x, window_y, window_width, window_height)
-        pygame.draw.rect(self.screen, (40, 40, 40), help_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), help_rect, 3)
+        pygame.draw.rect(layer, (40, 40, 40), help_rect)
+        pygame.draw.rect(layer, (255, 255, 255), help_rect, 3)
         
         #Названия
-        title_font = pygame.font.Font(None, 48)
-        title_text = title_font.render("Помощь", True, (255, 255, 255))
+        title_font = get_font(48)
+        title_text = render_text(title_font, "Помощь", (255, 255, 255))
         title_rect = title_text.get_rect(center=(self.screen_width // 2, window_y + 40))
-        self.screen.blit(title_text, title_rect)
+        layer.blit(title_text, title_rect)
         
         left_sections = [
             ("Управление:", [
@@ -690,14 +919,14 @@ class GameManager:
         current_y = window_y + 80
         
         for section_title, section_items in left_sections:
-            section_font = pygame.font.Font(None, 32)
-            section_text = section_font.render(section_title, True, (255, 255, 0))
-            self.screen.blit(section_text, (window_x + 20, current_y))
+            section_font = get_font(32)
+            section_text = render_text(section_font, section_title, (255, 255, 0))
+            layer.blit(section_text, (window_x + 20, current_y))
             current_y += 35
             
             for item in section_items:
-                item_text = self.small_font.render(item, True, (255, 255, 255))
-                self.screen.blit(item_text, (window_x + 40, current_y))
+                item_text = render_text(self.small_font, item, (255, 255, 255))
+                layer.blit(item_text, (window_x + 40, current_y))
                 current_y += 22
             
             current_y += 10
@@ -705,19 +934,19 @@ class GameManager:
         right_x = window_x + window_width // 2 + 20
         right_y = window_y + 80
         
-        section_font = pygame.font.Font(None, 32)
-        section_text = section_font.render(right_section[0], True, (255, 255, 0))
-        self.screen.blit(section_text, (right_x, right_y))
+        section_font = get_font(32)
+        section_text = render_text(section_font, right_section[0], (255, 255, 0))
+        layer.blit(section_text, (right_x, right_y))
         right_y += 35
         
         for item in right_section[1]:
-            item_text = self.small_font.render(item, True, (255, 255, 255))
-            self.screen.blit(item_text, (right_x, right_y))
+            item_text = render_text(self.small_font, item, (255, 255, 255))
+            layer.blit(item_text, (right_x, right_y))
             right_y += 22
         
-        close_text = self.small_font.render("Нажмите TAB чтобы закрыть", True, (200, 200, 200))
+        close_text = render_text(self.small_font, "Нажмите TAB чтобы закрыть", (200, 200, 200))
         close_rect = close_text.get_rect(center=(self.screen_width // 2, window_y + window_height + 30))
-        self.screen.blit(close_text, close_rect)
+        layer.blit(close_text, close_rect)
     
     def draw_card_collection_button(self):
         """отрисовка кнопки коллекции"""
@@ -732,7 +961,7 @@ class GameManager:
         pygame.draw.rect(self.screen, (255, 255, 255), button_rect, 2)
         
         #отрисовка текста
-        button_text = self.small_font.render("Коллекция карт", True, (255, 255, 255))
+        button_text = render_text(self.small_font, "Коллекция карт", (255, 255, 255))
         text_rect = button_text.get_rect(center=button_rect.center)
         self.screen.blit(button_text, text_rect)
     
@@ -796,11 +1025,7 @@ class GameManager:
         """отрисовка карт в коллекции"""
         from card import CARD_DATABASE
         
-        #прозрачный бэкграунд
-        overlay = pygame.Surface((self.screen_width, self.screen_height))
-        overlay.set_alpha(128)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
+        self.draw_overlay_layer("collection", 128, (), self.build_collection_layer)
         
         #вид коллекции
         window_width = 900
@@ -808,32 +1033,6 @@ class GameManager:
         window_x = (self.screen_width - window_width) // 2
         window_y = (self.screen_height - window_height) // 2
         
-        collection_rect = pygame.Rect(window_x, window_y, window_width, window_height)
-        pygame.draw.rect(self.screen, (40, 40, 40), collection_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), collection_rect, 3)
-        
-        #тайтл
-        title_font = pygame.font.Font(None, 48)
-        title_text = title_font.render("Коллекция", True, (255, 255, 255))
-        title_rect = title_text.get_rect(center=(self.screen_width // 2, window_y + 40))
-        self.screen.blit(title_text, title_rect)
-        
-        #кнопка закрытия
-        close_button_rect = pygame.Rect(window_x + window_width - 40, window_y + 10, 30, 30)
-        pygame.draw.rect(self.screen, (80, 80, 80), close_button_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), close_button_rect, 2)
-        
-        #отрисовка Х
-        center_x = close_button_rect.centerx
-        center_y = close_button_rect.centery
-        offset = 8
-        pygame.draw.line(self.screen, (255, 255, 255), 
-                        (center_x - offset, center_y - offset), 
-                        (center_x + offset, center_y + offset), 3)
-        pygame.draw.line(self.screen, (255, 255, 255), 
-                        (center_x + offset, center_y - offset), 
-                        (center_x - offset, center_y + offset), 3)
-        
         #контент для скролла
         content_area_x = window_x + 20
         content_area_y = window_y + 80
@@ -845,127 +1044,162 @@ class GameManager:
         
         #зажим кратинок так, чтобы они не вываливались из окна
         original_clip = self.screen.get_clip()
-        self.screen.set_clip(content_clip_rect)
+        self.screen.set_clip(content_clip_rect.clip(original_clip))
         
         #отрисовка карт с описанием
         entry_height = 220 
         entry_spacing = 30
+        entry_stride = entry_height + entry_spacing
         
-        for i, card_template in enumerate(CARD_DATABASE):
-            entry_y = content_area_y + i * (entry_height + entry_spacing) - self.collection_scroll_offset
-            
-            #скип того, что вне экрана
-            if entry_y + entry_height < content_area_y - 50 or entry_y > content_area_y + content_area_height + 50:
-                continue
-            
-            #карты для дисплея
-            display_card = type(card_template)(
-                card_template.name,
-                card_template.cost,
-                card_template.card_type,
-                card_template.description,
-                card_template.attack,
-                card_template.health,
-                card_template.spell_damage,
-                card_template.image_path,
-                card_template.cost_icon_path,
-                card_template.attack_icon_path,
-                card_template.health_icon_path,
-                card_template.spell_icon_path
-            )
-            
-            #отрисовка карты слева
-            card_x = content_area_x + 15
-            card_y = entry_y + 10
-            
-            #отрисовка только если видна
-            if card_y >= content_area_y - 160 and card_y <= content_area_y + content_area_height:
-                display_card.draw(self.screen, card_x, card_y, False)
+        #только видимое окно записей
+        first = max(0, self.collection_scroll_offset // entry_stride)
+        last = min(len(CARD_DATABASE), (self.collection_scroll_offset + content_area_height) // entry_stride + 1)
+        
+        for i in range(first, last):
+            entry_y = content_area_y + i * entry_stride - self.collection_scroll_offset
+            is_last = (i == len(CARD_DATABASE) - 1)
+            entry = self.get_collection_entry(i, CARD_DATABASE[i], content_area_width, is_last)
+            self.screen.blit(entry, (content_area_x, entry_y))
+
+        self.screen.set_clip(original_clip)
+    
+    def get_collection_entry(self, index, card_template, width, is_last):
+        """запись коллекции из кэша, собирается один раз на карту"""
+        key = (index, width, is_last)
+        entry = self.collection_entries.get(key)
+        if entry is None:
+            entry = self.build_collection_entry(card_template, width, is_last)
+            self.collection_entries[key] = entry
+        return entry
+    
+    def build_collection_entry(self, card_template, width, is_last):
+        """картинка карты, описание и разделитель одной записи"""
+        entry_height = 220 
+        entry_spacing = 30
+        
+        entry = pygame.Surface((width, entry_height + entry_spacing))
+        entry.fill((40, 40, 40))
+        
+        #карты для дисплея
+        display_card = Card(card_template)
+        
+        #отрисовка карты слева
+        card_x = 15
+        card_y = 10
+        display_card.draw(entry, card_x, card_y, False)
+        
+        #отрисовка описания
+        desc_x = card_x + 150 
+        desc_y = 10 
+        desc_width = width - 180
+        
+        #имя карт
+        name_font = get_font(28)
+        name_text = render_text(name_font, display_card.name, (255, 255, 0))
+        entry.blit(name_text, (desc_x, desc_y))
+        
+        current_y = desc_y + 35
+        
+        #тип карты
+        type_cost_text = render_text(self.small_font, f"Тип: {display_card.card_type.value.title()} | Стоимость: {display_card.cost}", (200, 200, 200))
+        entry.blit(type_cost_text, (desc_x, current_y))
+        current_y += 28
+        
+        #Описание существ
+        if display_card.card_type.value == "minion":
+            stats_text = render_text(self.small_font, f"Урон: {display_card.attack} | Здоровье: {display_card.health}", (200, 200, 200))
+            entry.blit(stats_text, (desc_x, current_y))
+            current_y += 28
+        
+        # спелл дмг
+        if display_card.spell_damage != 0:
+            if display_card.spell_damage > 0:
+                spell_text = render_text(self.small_font, f"Урон способностями: {display_card.spell_damage}", (200, 100, 200))
+            else:
+                spell_text = render_text(self.small_font, f"Здоровье: {abs(display_card.spell_damage)}", (100, 255, 100))
+            entry.blit(spell_text, (desc_x, current_y))
+            current_y += 28
+        
+        #описание
+        if display_card.description:
+            current_y += 15
+            desc_title = render_text(self.small_font, "Описание:", (255, 255, 255))
+            entry.blit(desc_title, (desc_x, current_y))
+            current_y += 25
             
-            #отрисовка описания
-            desc_x = card_x + 150 
-            desc_y = entry_y + 10 
-            desc_width = content_area_width - 180
+            #перенос слов по ширине без отрисовки
+            words = display_card.description.split()
+            lines = []
+            current_line = ""
+            max_width = desc_width - 20
             
-            #отрисовка описания если оно помещается
-            if desc_y >= content_area_y - 50 and desc_y <= content_area_y + content_area_height + 50:
-                #имя карт
-                name_font = pygame.font.Font(None, 28)
-                name_text = name_font.render(display_card.name, True, (255, 255, 0))
-                self.screen.blit(name_text, (desc_x, desc_y))
-                
-                current_y = desc_y + 35
-                
-                #тип карты
-                type_cost_text = self.small_font.render(f"Тип: {display_card.card_type.value.title()} | Стоимость: {display_card.cost}", True, (200, 200, 200))
-                self.screen.blit(type_cost_text, (desc_x, current_y))
-                current_y += 28
-                
-                #Описание существ
-                if display_card.card_type.value == "minion":
-                    stats_text = self.small_font.render(f"Урон: {display_card.attack} | Здоровье: {display_card.health}", True, (200, 200, 200))
-                    self.screen.blit(stats_text, (desc_x, current_y))
-                    current_y += 28
-                
-                # спелл дмг
-                if display_card.spell_damage != 0:
-                    if display_card.spell_damage > 0:
-                        spell_text = self.small_font.render(f"Урон способностями: {display_card.spell_damage}", True, (200, 100, 200))
-                    else:
-                        spell_text = self.small_font.render(f"Здоровье: {abs(display_card.spell_damage)}", True, (100, 255, 100))
-                    self.screen.blit(spell_text, (desc_x, current_y))
-                    current_y += 28
-                
-                #описание
-                if display_card.description:
-                    current_y += 15
-                    desc_title = self.small_font.render("Описание:", True, (255, 255, 255))
-                    self.screen.blit(desc_title, (desc_x, current_y))
-                    current_y += 25
-                    
-                    words = display_card.description.split()
-                    lines = []
-                    current_line = ""
-                    max_width = desc_width - 20
-                    
-                    for word in words:
-                        test_line = current_line + (" " if current_line else "") + word
-                        test_surface = self.small_font.render(test_line, True, (255, 255, 255))
-                        if test_surface.get_width() <= max_width:
-                            current_line = test_line
-                        else:
-                            if current_line:
-                                lines.append(current_line)
-                            current_line = word
-                    
+            for word in words:
+                test_line = current_line + (" " if current_line else "") + word
+                if self.small_font.size(test_line)[0] <= max_width:
+                    current_line = test_line
+                else:
                     if current_line:
                         lines.append(current_line)
-                    
-                    #отрисовка с нужными скейлами
-                    for line in lines:
-                        if current_y <= entry_y + entry_height - 10:
-                            desc_text = self.small_font.render(line, True, (180, 180, 180))
-                            if desc_x + desc_text.get_width() <= content_area_x + content_area_width - 15:
-                                self.screen.blit(desc_text, (desc_x, current_y))
-                        current_y += 22
+                    current_line = word
             
-            #отрисовка линий меж контентом
-            if i < len(CARD_DATABASE) - 1:
-                separator_y = entry_y + entry_height + entry_spacing // 2
-                if separator_y >= content_area_y and separator_y <= content_area_y + content_area_height:
-                    pygame.draw.line(self.screen, (100, 100, 100), 
-                                   (content_area_x + 10, separator_y), 
-                                   (content_area_x + content_area_width - 10, separator_y), 1)
-
-        self.screen.set_clip(original_clip)
+            if current_line:
+                lines.append(current_line)
+            
+            #отрисовка с нужными скейлами
+            for line in lines:
+                if current_y <= entry_height - 10:
+                    desc_text = render_text(self.small_font, line, (180, 180, 180))
+                    if desc_x + desc_text.get_width() <= width - 15:
+                        entry.blit(desc_text, (desc_x, current_y))
+                current_y += 22
+        
+        #отрисовка линий меж контентом
+        if not is_last:
+            separator_y = entry_height + entry_spacing // 2
+            pygame.draw.line(entry, (100, 100, 100), (10, separator_y), (width - 10, separator_y), 1)
+        
+        return entry
+    
+    def build_collection_layer(self, layer):
+        """рамка, заголовок и кнопка закрытия коллекции"""
+        #вид коллекции
+        window_width = 900
+        window_height = 600
+        window_x = (self.screen_width - window_width) // 2
+        window_y = (self.screen_height - window_height) // 2
+        
+        collection_rect = pygame.Rect(window_x, window_y, window_width, window_height)
+        pygame.draw.rect(layer, (40, 40, 40), collection_rect)
+        pygame.draw.rect(layer, (255, 255, 255), collection_rect, 3)
+        
+        #тайтл
+        title_font = get_font(48)
+        title_text = render_text(title_font, "Коллекция", (255, 255, 255))
+        title_rect = title_text.get_rect(center=(self.screen_width // 2, window_y + 40))
+        layer.blit(title_text, title_rect)
+        
+        #кнопка закрытия
+        close_button_rect = pygame.Rect(window_x + window_width - 40, window_y + 10, 30, 30)
+        pygame.draw.rect(layer, (80, 80, 80), close_button_rect)
+        pygame.draw.rect(layer, (255, 255, 255), close_button_rect, 2)
+        
+        #отрисовка Х
+        center_x = close_button_rect.centerx
+        center_y = close_button_rect.centery
+        offset = 8
+        pygame.draw.line(layer, (255, 255, 255), 
+                        (center_x - offset, center_y - offset), 
+                        (center_x + offset, center_y + offset), 3)
+        pygame.draw.line(layer, (255, 255, 255), 
+                        (center_x + offset, center_y - offset), 
+                        (center_x - offset, center_y + offset), 3)
     
     def draw_menu(self):
         """ескейп оверлей"""
-        overlay = pygame.Surface((self.screen_width, self.screen_height))
-        overlay.set_alpha(128)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-        
+        self.draw_overlay_layer("menu", 128, (self.menu_selected_option,), self.build_menu_layer)
+    
+    def build_menu_layer(self, layer):
+        """окно меню"""
         #вид меню
         window_width = 400
         window_height = 300
@@ -974,17 +1208,17 @@ class GameManager:
         
         #бэкграунд меню
         menu_rect = pygame.Rect(window_x, window_y, window_width, window_height)
-        pygame.draw.rect(self.screen, (40, 40, 40), menu_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), menu_rect, 3)
+        pygame.draw.rect(layer, (40, 40, 40), menu_rect)
+        pygame.draw.rect(layer, (255, 255, 255), menu_rect, 3)
         
         # Тайтл
-        title_font = pygame.font.Font(None, 48)
-        title_text = title_font.render("Меню", True, (255, 255, 255))
+        title_font = get_font(48)
+        title_text = render_text(title_font, "Меню", (255, 255, 255))
         title_rect = title_text.get_rect(center=(self.screen_width // 2, window_y + 50))
-        self.screen.blit(title_text, title_rect)
+        layer.blit(title_text, title_rect)
         
         # Опции в менню
-        option_font = pygame.font.Font(None, 36)
+        option_font = get_font(36)
         start_y = window_y + 120
         
         for i, option in enumerate(self.menu_options):
@@ -993,13 +1227,13 @@ class GameManager:
                 color = (255, 255, 0)
                 # бэкграунд выбранного
                 option_bg = pygame.Rect(window_x + 50, start_y + i * 60 - 15, window_width - 100, 50)
-                pygame.draw.rect(self.screen, (80, 80, 80), option_bg)
+                pygame.draw.rect(layer, (80, 80, 80), option_bg)
             else:
                 color = (255, 255, 255)
             
-            option_text = option_font.render(option, True, color)
+            option_text = render_text(option_font, option, color)
             option_rect = option_text.get_rect(center=(self.screen_width // 2, start_y + i * 60 + 10))
-            self.screen.blit(option_text, option_rect)
+            layer.blit(option_text, option_rect)
     
     def handle_settings_mouse_click(self, pos):
         """маус клики в настройках"""
@@ -1072,8 +1306,8 @@ class GameManager:
         if selected == "Играть ещё раз":
             self.restart_game()
         elif selected == "Выйти":
-            pygame.quit()
-            exit()
+            #выход через главный цикл, чтобы shutdown сохранил запись и остановил компьютер
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
     
     def handle_game_over_mouse_click(self, pos):
         """клик на геймовер"""
@@ -1115,7 +1349,6 @@ class GameManager:
         self.selected_card_index = -1
         self.selected_minion_index = -1
         self.attack_mode = False
-        self.turn_number = 1
         self.show_help = False
         self.show_menu = False
         self.show_settings = False
@@ -1128,34 +1361,34 @@ class GameManager:
         self.dragged_card_index = -1
         self.game_over_selected_option = 0
         
-        self.player1 = Player("Игрок 1", True)
-        self.player2 = Player("Игрок 2", True)
-        self.current_player = self.player1
-        self.other_player = self.player2
+        self.save_replay()
+        self.state = self.create_game_state()
+        self.replay_saved = False
+        if self.ai:
+            self.ai.cancel()
     
     def draw_settings(self):
         """Отрисовка меню"""
-        overlay = pygame.Surface((self.screen_width, self.screen_height))
-        overlay.set_alpha(128)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-        
+        self.draw_overlay_layer("settings", 128, (self.volume,), self.build_settings_layer)
+    
+    def build_settings_layer(self, layer):
+        """окно настроек"""
         window_width = 500
         window_height = 400
         window_x = (self.screen_width - window_width) // 2
         window_y = (self.screen_height - window_height) // 2
         
         settings_rect = pygame.Rect(window_x, window_y, window_width, window_height)
-        pygame.draw.rect(self.screen, (40, 40, 40), settings_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), settings_rect, 3)
+        pygame.draw.rect(layer, (40, 40, 40), settings_rect)
+        pygame.draw.rect(layer, (255, 255, 255), settings_rect, 3)
         
-        title_font = pygame.font.Font(None, 48)
-        title_text = title_font.render("Настройки", True, (255, 255, 255))
+        title_font = get_font(48)
+        title_text = render_text(title_font, "Настройки", (255, 255, 255))
         title_rect = title_text.get_rect(center=(self.screen_width // 2, window_y + 50))
-        self.screen.blit(title_text, title_rect)
+        layer.blit(title_text, title_rect)
         
-        volume_label = self.font.render("Звук:", True, (255, 255, 255))
-        self.screen.blit(volume_label, (window_x + 50, window_y + 140))
+        volume_label = render_text(self.font, "Звук:", (255, 255, 255))
+        layer.blit(volume_label, (window_x + 50, window_y + 140))
         
         slider_y = window_y + 150
         slider_x = window_x + 150
@@ -1163,42 +1396,41 @@ class GameManager:
         slider_height = 10
         
         track_rect = pygame.Rect(slider_x, slider_y, slider_width, slider_height)
-        pygame.draw.rect(self.screen, (100, 100, 100), track_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), track_rect, 2)
+        pygame.draw.rect(layer, (100, 100, 100), track_rect)
+        pygame.draw.rect(layer, (255, 255, 255), track_rect, 2)
         
         fill_width = int(slider_width * self.volume)
         if fill_width > 0:
             fill_rect = pygame.Rect(slider_x, slider_y, fill_width, slider_height)
-            pygame.draw.rect(self.screen, (0, 255, 0), fill_rect)
+            pygame.draw.rect(layer, (0, 255, 0), fill_rect)
         
         handle_x = slider_x + int(slider_width * self.volume) - 5
         handle_rect = pygame.Rect(handle_x, slider_y - 5, 10, 20)
-        pygame.draw.rect(self.screen, (255, 255, 255), handle_rect)
-        pygame.draw.rect(self.screen, (0, 0, 0), handle_rect, 2)
+        pygame.draw.rect(layer, (255, 255, 255), handle_rect)
+        pygame.draw.rect(layer, (0, 0, 0), handle_rect, 2)
         
-        volume_text = self.small_font.render(f"{int(self.volume * 100)}%", True, (255, 255, 255))
-        self.screen.blit(volume_text, (slider_x + slider_width + 20, window_y + 145))
+        volume_text = render_text(self.small_font, f"{int(self.volume * 100)}%", (255, 255, 255))
+        layer.blit(volume_text, (slider_x + slider_width + 20, window_y + 145))
         
         back_button_rect = pygame.Rect(window_x + 50, window_y + window_height - 80, 100, 40)
-        pygame.draw.rect(self.screen, (80, 80, 80), back_button_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), back_button_rect, 2)
+        pygame.draw.rect(layer, (80, 80, 80), back_button_rect)
+        pygame.draw.rect(layer, (255, 255, 255), back_button_rect, 2)
         
-        back_text = self.font.render("Назад", True, (255, 255, 255))
+        back_text = render_text(self.font, "Назад", (255, 255, 255))
         back_text_rect = back_text.get_rect(center=back_button_rect.center)
-        self.screen.blit(back_text, back_text_rect)
+        layer.blit(back_text, back_text_rect)
         
     
     def draw_hand_with_drag(self, player, y_position):
         """отрисовка руки даже с взятой картой"""
-        hand_width = len(player.hand) * 130
-        start_x = (self.screen_width - hand_width) // 2
+        xs = row_xs(len(player.hand), self.screen_width)
         
         for i, card in enumerate(player.hand):
             #скип карты, что ты тащищь
             if self.dragging and i == self.dragged_card_index:
                 continue
                 
-            x = start_x + i * 130
+            x = xs[i]
             selected = (i == self.selected_card_index and not self.dragging)
             card.draw(self.screen, x, y_position, selected)
     
@@ -1219,65 +1451,65 @@ class GameManager:
             
             self.screen.blit(card_surface, (draw_x, draw_y))
     
+    def capture_flip_snapshot(self, bottom_player, top_player):
+        """снимок стола со стороны нижнего игрока"""
+        snapshot = pygame.Surface((self.screen_width, self.screen_height), 0, self.screen)
+        if self.background_image:
+            snapshot.blit(self.background_image, (0, 0))
+        else:
+            snapshot.fill((0, 0, 0))
+        
+        top_player.draw_board(snapshot, self.layout.enemy_board_y)
+        top_player.draw_info(snapshot, 10, 10)
+        bottom_player.draw_board(snapshot, self.layout.board_y)
+        bottom_player.draw_hand(snapshot, self.layout.hand_y)
+        bottom_player.draw_info(snapshot, 10, self.screen_height - 120)
+        return snapshot
+    
     def draw_table_flip(self):
         """отрисовка тейбл флипа"""
         angle = self.flip_progress * math.pi
         
-        flip_surface = pygame.Surface((self.screen_width, self.screen_height))
-        if self.background_image:
-            flip_surface.blit(self.background_image, (0, 0))
-        else:
-            flip_surface.fill((0, 0, 0))
-        
-
+        #до середины - стол текущего игрока, после - следующего
         if self.flip_progress < 0.5:
-            #отрисовка состояния игры
-            self.other_player.draw_board(flip_surface, 50)
-            self.other_player.draw_info(flip_surface, 10, 10)
-            self.current_player.draw_board(flip_surface, self.screen_height - 350)
-            self.current_player.draw_hand(flip_surface, self.screen_height - 180)
-            self.current_player.draw_info(flip_surface, 10, self.screen_height - 120)
+            snapshot = self.flip_snapshots[0]
         else:
-            self.current_player.draw_board(flip_surface, 50)
-            self.current_player.draw_info(flip_surface, 10, 10)
-            self.other_player.draw_board(flip_surface, self.screen_height - 350)
-            self.other_player.draw_hand(flip_surface, self.screen_height - 180)
-            self.other_player.draw_info(flip_surface, 10, self.screen_height - 120)
+            snapshot = self.flip_snapshots[1]
         
         #применение флипа
         scale_y = abs(math.cos(angle))
         if scale_y < 0.1:
             scale_y = 0.1
         
-        #скейл сёрфейса
+        #центрирование
         scaled_height = int(self.screen_height * scale_y)
-        scaled_surface = pygame.transform.scale(flip_surface, (self.screen_width, scaled_height))
+        y_offset = (self.screen_height - scaled_height) // 2
         
-        #чёрный бэкграунд
-        self.screen.fill((0, 0, 0))
+        #чёрные полосы только сверху и снизу
+        self.screen.fill((0, 0, 0), (0, 0, self.screen_width, y_offset))
+        self.screen.fill((0, 0, 0), (0, y_offset + scaled_height, self.screen_width, self.screen_height - y_offset - scaled_height))
         
-        #центрирование
-        y_offset = (self.screen_height - scaled_height) // 2
-        self.screen.blit(scaled_surface, (0, y_offset))
+        #сжатие снимка сразу в экран
+        target = self.screen.subsurface((0, y_offset, self.screen_width, scaled_height))
+        pygame.transform.scale(snapshot, (self.screen_width, scaled_height), target)
     
     def draw_game_over(self):
         """геймовер скрин"""
-        overlay = pygame.Surface((self.screen_width, self.screen_height))
-        overlay.set_alpha(128)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-        
+        self.draw_overlay_layer("game_over", 128, (self.winner.name, self.game_over_selected_option), self.build_game_over_layer)
+    
+    def build_game_over_layer(self, layer):
+        """надписи и кнопки геймовера"""
         #геймовер текст
-        game_over_font = pygame.font.Font(None, 72)
-        game_over_text = game_over_font.render("GAME OVER", True, (255, 0, 0))
-        winner_text = self.font.render(f"{self.winner.name} Победил!", True, (255, 255, 0))
+        game_over_font = get_font(72)
+        game_over_text = render_text(game_over_font, "GAME OVER", (255, 0, 0))
+        winner_text = render_text(self.font, f"{self.winner.name} Победил!", (255, 255, 0))
         
         #центрирование
         game_over_rect = game_over_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 100))
         winner_rect = winner_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 50))
         
-        self.screen.blit(game_over_text, game_over_rect)
-        self.screen.blit(winner_text, winner_rect)
+        layer.blit(game_over_text, game_over_rect)
+        layer.blit(winner_text, winner_rect)
         
         #отрисовка кнопок
         button_width = 200
@@ -1292,75 +1524,86 @@ class GameManager:
             #отсвечивание выбранной кнопки
             if i == self.game_over_selected_option:
                 color = (255, 255, 0) 
-                pygame.draw.rect(self.screen, (80, 80, 80), button_rect)
+                pygame.draw.rect(layer, (80, 80, 80), button_rect)
             else:
                 color = (255, 255, 255)
-                pygame.draw.rect(self.screen, (40, 40, 40), button_rect)
+                pygame.draw.rect(layer, (40, 40, 40), button_rect)
         
-            pygame.draw.rect(self.screen, (255, 255, 255), button_rect, 2)
+            pygame.draw.rect(layer, (255, 255, 255), button_rect, 2)
             
 
-            button_text = self.font.render(option, True, color)
+            button_text = render_text(self.font, option, color)
             text_rect = button_text.get_rect(center=button_rect.center)
-            self.screen.blit(button_text, text_rect)
+            layer.blit(button_text, text_rect)
+    
+    def start_photo_preload(self):
+        """фоновая подготовка картинки переворота под текущий экран"""
+        size = (self.screen_width, self.screen_height)
+        self.photo_overlay = None
+        self.photo_overlay_size = size
+        self.photo_loader = loader.submit(self.build_photo_overlay, size)
+    
+    def build_photo_overlay(self, size):
+        """декод, скейл и поворот картинки переворота один раз"""
+        screen_width, screen_height = size
+        try:
+            photo = pygame.image.load(PHOTO_PATH)
+        except (pygame.error, FileNotFoundError):
+            return
+        
+        photo_width, photo_height = photo.get_size()
+        
+        scale_x = screen_width / photo_width
+        scale_y = screen_height / photo_height
+        scale = max(scale_x, scale_y) * 0.56
+        
+        new_width = int(photo_width * scale)
+        new_height = int(photo_height * scale)
+        
+        photo = pygame.transform.scale(photo, (new_width, new_height))
+        
+        #ротейт на 90*
+        photo = pygame.transform.rotate(photo, 90)
+        
+        rotated_width, rotated_height = photo.get_size()
+        
+        #заполнение бэкграунда чёрным
+        overlay = pygame.Surface(size)
+        overlay.fill((0, 0, 0))
+        
+        #центрирование
+        photo_x = (screen_width - rotated_width) // 2
+        photo_y = (screen_height - rotated_height) // 2
+        
+        overlay.blit(photo, (photo_x, photo_y))
+        
+        #картинка под старый размер экрана не нужна
+        if size == self.photo_overlay_size:
+            self.photo_overlay = overlay
     
     def draw_photo_overlay(self):
         """отрисовка картинки переворота"""
-        try:
-            photo_files = "Heartstone/assets/switch.jpg"
-            photo_loaded = False
-            for photo_file in photo_files:
-                if os.path.exists("Heartstone/assets/switch.jpg"):
-                    try:
-                        photo = pygame.image.load("Heartstone/assets/switch.jpg")
-                    
-                        photo_width, photo_height = photo.get_size()
-                        
-                        scale_x = self.screen_width / photo_width
-                        scale_y = self.screen_height / photo_height
-                        scale = max(scale_x, scale_y) * 0.56
-                        
-                        new_width = int(photo_width * scale)
-                        new_height = int(photo_height * scale)
-                        
-                        photo = pygame.transform.scale(photo, (new_width, new_height))
-                        
-                        #ротейт на 90*
-                        photo = pygame.transform.rotate(photo, 90)
-                        
-                        rotated_width, rotated_height = photo.get_size()
-                        
-                        #заполнение бэкграунда чёрным
-                        self.screen.fill((0, 0, 0))
-                        
-                        #центрирование
-                        photo_x = (self.screen_width - rotated_width) // 2
-                        photo_y = (self.screen_height - rotated_height) // 2
-                        
-                        self.screen.blit(photo, (photo_x, photo_y))
-                        photo_loaded = True
-                        break
-                    except pygame.error:
-                        continue
-
-        except Exception:
-            overlay = pygame.Surface((self.screen_width, self.screen_height))
-            overlay.fill((0, 0, 0))
-            self.screen.blit(overlay, (0, 0))
+        if (self.screen_width, self.screen_height) != self.photo_overlay_size:
+            self.start_photo_preload()
+        
+        if self.photo_overlay is not None:
+            self.screen.blit(self.photo_overlay, (0, 0))
+        elif not self.photo_loader.done():
+            #картинка ещё готовится
+            self.screen.fill((0, 0, 0))
         
         #инструкции
-        instruction_font = pygame.font.Font(None, 36)
-        instruction_text = instruction_font.render("Нажмите SPACE для продолжения", True, (255, 255, 255))
+        instruction_font = get_font(36)
+        instruction_text = render_text(instruction_font, "Нажмите SPACE для продолжения", (255, 255, 255))
         instruction_rect = instruction_text.get_rect(center=(self.screen_width // 2, self.screen_height - 50))
         self.screen.blit(instruction_text, instruction_rect)
     
     def draw_player_board_with_selection(self, player, y_position):
         """хайлайт выбранного существа"""
-        board_width = len(player.board) * 130
-        start_x = (self.screen_width - board_width) // 2
+        xs = row_xs(len(player.board), self.screen_width)
         
         for i, card in enumerate(player.board):
-            x = start_x + i * 130
+            x = xs[i]
             selected = (self.attack_mode and i == self.selected_minion_index)
             card.draw(self.screen, x, y_position, selected)
     
@@ -0,0 +1,111 @@
+import pygame
+
+#размер карты на столе и в руке
+CARD_WIDTH = 120
+CARD_HEIGHT = 160
+
+#шаг между картами в ряду
+CARD_STRIDE = 130
+
+#насколько цель для брошенной карты шире самой карты
+DROP_MARGIN = 10
+
+#в колонке нет карты
+NO_SLOT = 255
+
+#x карт по числу карт и ширине экрана
+_ROW_XS = {}
+
+
+def row_xs(count, width):
+    """x карт ряда из count карт по центру ширины width"""
+    key = (count, width)
+    xs = _ROW_XS.get(key)
+    if xs is None:
+        start_x = (width - count * CARD_STRIDE) // 2
+        xs = tuple(start_x + i * CARD_STRIDE for i in range(count))
+        _ROW_XS[key] = xs
+    return xs
+
+
+class Row:
+    """ряд карт: прямоугольники и готовый индекс колонка экрана -> место в ряду"""
+
+    def __init__(self, count, width, y, margin=0):
+        self.y = y
+        self.xs = row_xs(count, width)
+        self.rects = [pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT) for x in self.xs]
+        self.top = y - margin
+        self.bottom = y + CARD_HEIGHT + margin
+
+        columns = bytearray([NO_SLOT]) * width
+        #с конца: где расширенные цели пересекаются, остаётся левая карта, как при обходе слева
+        for i in range(count - 1, -1, -1):
+            left = max(0, self.xs[i] - margin)
+            right = min(width, self.xs[i] + CARD_WIDTH + margin)
+            if right > left:
+                columns[left:right] = bytes([i]) * (right - left)
+        self.columns = columns
+
+    def at(self, pos):
+        """место карты под точкой, -1 если там нет карты"""
+        x, y = pos
+        if self.top <= y < self.bottom and 0 <= x < len(self.columns):
+            slot = self.columns[x]
+            if slot != NO_SLOT:
+                return slot
+        return -1
+
+
+class Layout:
+    """геометрия стола для отрисовки и для попаданий мышью, ряды пересчитываются только при смене числа карт"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        #ряды карт
+        self.enemy_board_y = 50
+        self.board_y = height - 350
+        self.hand_y = height - 180
+
+        #портреты героев
+        self.enemy_hero = pygame.Rect(10, 10, 200, 100)
+        self.own_hero = pygame.Rect(10, height - 120, 200, 100)
+
+        #инфо игроков
+        self.enemy_info = pygame.Rect(8, 10, 164, 104)
+        self.own_info = pygame.Rect(8, height - 120, 164, 104)
+
+        #зоны для брошенной карты: возврат в руку и выкладка на стол
+        self.hand_zone = pygame.Rect(0, self.hand_y - 20, width, 200)
+        self.board_zone = pygame.Rect(0, height - 400, width, 200)
+
+        #готовые ряды по (число карт, y, запас)
+        self.rows = {}
+        self.counts = None
+        self.update(0, 0, 0)
+
+    def row(self, count, y, margin=0):
+        """ряд из кэша"""
+        key = (count, y, margin)
+        row = self.rows.get(key)
+        if row is None:
+            row = Row(count, self.width, y, margin)
+            self.rows[key] = row
+        return row
+
+    def update(self, hand_count, board_count, enemy_count):
+        """ряды под текущее число карт в руке, на своём и чужом столе"""
+        counts = (hand_count, board_count, enemy_count)
+        if counts == self.counts:
+            return self
+        self.counts = counts
+        self.hand = self.row(hand_count, self.hand_y)
+        self.board = self.row(board_count, self.board_y)
+        self.enemy_board = self.row(enemy_count, self.enemy_board_y)
+
+        #цели для брошенной карты чуть шире карт
+        self.board_drop = self.row(board_count, self.board_y, DROP_MARGIN)
+        self.enemy_drop = self.row(enemy_count, self.enemy_board_y, DROP_MARGIN)
+        return self
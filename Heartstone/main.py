@@ -1,33 +1,70 @@
 import pygame
 import sys
 from game_manager import GameManager
+from scheduler import IdleScheduler
+from replay import Replay
 
-def main():
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
     pygame.init()
     
     #скрин
     SCREEN_WIDTH = 1280 
     SCREEN_HEIGHT = 720
     
+    #перерисовка только изменившихся областей
+    DIRTY_RECTS = "--dirty-rects" in argv
+    
+    #игра против компьютера, --ai-budget=секунды на одно решение
+    VS_AI = "--ai" in argv
+    AI_BUDGET = 0.5
+    
+    #статистика поиска компьютера в консоль
+    AI_STATS = "--ai-stats" in argv
+    
+    #просмотр записанной партии, --replay-speed=во сколько раз быстрее
+    REPLAY = None
+    REPLAY_SPEED = 1.0
+    for arg in argv:
+        if arg.startswith("--ai-budget="):
+            AI_BUDGET = float(arg.split("=", 1)[1])
+        elif arg.startswith("--replay="):
+            REPLAY = Replay.load(arg.split("=", 1)[1])
+        elif arg.startswith("--replay-speed="):
+            REPLAY_SPEED = float(arg.split("=", 1)[1])
+    
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Bloody Requiem")
     
-    clock = pygame.time.Clock()
-    game_manager = GameManager(screen)
+    scheduler = IdleScheduler(60)
+    game_manager = GameManager(screen, DIRTY_RECTS, VS_AI, AI_BUDGET, REPLAY, REPLAY_SPEED, AI_STATS)
+    
+    #первый кадр, дальше рисуем только по событиям и анимациям
+    game_manager.draw()
+    pygame.display.flip()
     
     running = True
     while running:
-        for event in pygame.event.get():
+        busy = game_manager.is_animating()
+        events = scheduler.next_events(busy)
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             else:
                 game_manager.handle_event(event)
         
+        #проснулись без ввода и анимаций - кадр не нужен
+        if not events and not busy:
+            continue
+        
         game_manager.update()
-        game_manager.draw()
-        pygame.display.flip()
-        clock.tick(60)
+        if DIRTY_RECTS:
+            pygame.display.update(game_manager.draw_dirty())
+        else:
+            game_manager.draw()
+            pygame.display.flip()
     
+    game_manager.shutdown()
     pygame.quit()
     sys.exit()
 
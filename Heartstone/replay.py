@@ -0,0 +1,250 @@
+import os
+import sys
+import time
+import glob
+import random
+import struct
+import argparse
+from array import array
+from engine import GameState, decode_action
+from storage import write_atomic
+from simulate import POLICIES, run_game, winner_side
+
+#пути от модуля, как в card_data: запуск не из корня репозитория пишет и читает те же папки
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+#куда игра пишет сыгранные партии
+REPLAY_DIR = os.path.join(_HERE, "replays")
+
+#записи-эталоны для проверки движка и замеров
+FIXTURE_DIR = os.path.join(_HERE, "fixtures")
+
+#секунд между действиями при просмотре на скорости 1
+ACTION_DELAY = 0.8
+
+
+class Replay:
+    """запись партии: сид колод, коды действий и итог для сверки"""
+
+    #магия, версия, сид, число действий, хэш итоговой позиции, победитель, номер хода
+    HEADER = struct.Struct("<4sHQIQbH")
+    MAGIC = b"HSRP"
+    VERSION = 1
+
+    def __init__(self, seed, actions, final_hash=0, winner=-1, turns=1):
+        self.seed = seed
+        self.actions = array("H", actions)
+        self.final_hash = final_hash
+        self.winner = winner
+        self.turns = turns
+
+    @classmethod
+    def from_state(cls, state):
+        """запись партии, сыгранной с журналом от GameState(seed=...)"""
+        if state.seed is None or state.actions is None:
+            raise ValueError("only seeded games played with record=True can be replayed")
+        return cls(state.seed, state.actions, state.compute_hash(), winner_side(state), state.turn_number)
+
+    def to_bytes(self):
+        """заголовок и коды действий little-endian"""
+        actions = array("H", self.actions)
+        if sys.byteorder == "big":
+            actions.byteswap()
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, len(actions),
+                                  self.final_hash, self.winner, self.turns)
+        return header + actions.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """разбор записи, ValueError если это не она"""
+        if len(data) < cls.HEADER.size:
+            raise ValueError("replay is truncated")
+        magic, version, seed, count, final_hash, winner, turns = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a replay or unsupported version")
+        if len(data) != cls.HEADER.size + count * 2:
+            raise ValueError("replay is truncated")
+        actions = array("H")
+        actions.frombytes(data[cls.HEADER.size:])
+        if sys.byteorder == "big":
+            actions.byteswap()
+        return cls(seed, actions, final_hash, winner, turns)
+
+    def save(self, path):
+        """запись в файл через временный, чтобы не оставить половину"""
+        write_atomic(path, self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """чтение из файла"""
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def play(self):
+        """повтор без отрисовки и без журнала, возвращает итоговое состояние"""
+        state = GameState(seed=self.seed, record=False)
+        for code in self.actions:
+            if not state.apply_code(code):
+                raise ValueError(f"action {decode_action(code)} was rejected, replay diverged")
+        return state
+
+    def matches(self, state):
+        """совпал ли итог повтора с записанным"""
+        return (state.compute_hash() == self.final_hash and winner_side(state) == self.winner and
+                state.turn_number == self.turns)
+
+    def check_log(self):
+        """повтор с журналом: хэш после каждого действия и откат до начала, None или что разошлось"""
+        state = GameState(seed=self.seed)
+        start = GameState(seed=self.seed, record=False)
+        for step, code in enumerate(self.actions):
+            if not state.apply_code(code):
+                return f"action {step} {decode_action(code)} was rejected"
+            #инкрементальный хэш должен совпадать с посчитанным с нуля
+            if state.hash != state.compute_hash():
+                return f"hash drift after action {step} {decode_action(code)}"
+        if not self.matches(state):
+            return "final position differs"
+
+        while state.undo():
+            pass
+        if state.actions or state.hash != start.compute_hash() or state.compute_hash() != start.compute_hash():
+            return "undo did not restore the initial position"
+        #колоды и номер хода в хэш не входят
+        if state.turn_number != start.turn_number or state.side() != start.side() or any(
+                [t.id for t in p.deck] != [t.id for t in q.deck]
+                for p, q in ((state.player1, start.player1), (state.player2, start.player2))):
+            return "undo did not restore the turn or the decks"
+        return None
+
+
+def save_match(state, directory=REPLAY_DIR):
+    """запись партии из игры, путь к файлу или None если записать не вышло"""
+    path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + f"-{state.seed}.hsr")
+    try:
+        Replay.from_state(state).save(path)
+    except OSError as e:
+        print(f"Could not save replay: {e}")
+        return None
+    return path
+
+
+class ReplayDriver:
+    """ходы из записи вместо игрока: для GameManager выглядит как AIPlayer"""
+
+    def __init__(self, replay, speed=1.0):
+        self.actions = [decode_action(code) for code in replay.actions]
+        self.position = 0
+        self.action_delay = ACTION_DELAY / speed
+        self.next_action_time = 0.0
+        self.last_stats = None
+
+    def poll(self, state):
+        """следующее действие, когда пришло его время"""
+        if self.position >= len(self.actions) or time.perf_counter() < self.next_action_time:
+            return None
+        action = self.actions[self.position]
+        self.position += 1
+        self.next_action_time = time.perf_counter() + self.action_delay
+        return action
+
+    def finished(self):
+        """все действия записи уже отданы"""
+        return self.position >= len(self.actions)
+
+    def cancel(self):
+        """просмотр с начала"""
+        self.position = 0
+        self.next_action_time = 0.0
+
+    def shutdown(self):
+        """фоновых процессов нет"""
+        pass
+
+
+def generate_fixtures(directory, games, seed=0, policy1="greedy", policy2="random", turn_cap=100):
+    """партии стратегий с записью: эталоны для проверки движка"""
+    paths = []
+    for game_seed in range(seed, seed + games):
+        state = GameState(seed=game_seed)
+        run_game(state, (POLICIES[policy1], POLICIES[policy2]), random.Random(game_seed), turn_cap)
+        path = os.path.join(directory, f"{policy1}-{policy2}-{game_seed}.hsr")
+        Replay.from_state(state).save(path)
+        paths.append(path)
+    return paths
+
+
+def run_replays(paths, repeat=1):
+    """повтор записей на полной скорости: (расхождения, действий, секунд)"""
+    replays = [(path, Replay.load(path)) for path in paths]
+    failures = []
+    actions = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for path, replay in replays:
+            try:
+                ok = replay.matches(replay.play())
+            except ValueError:
+                ok = False
+            if not ok and path not in failures:
+                failures.append(path)
+            actions += len(replay.actions)
+    return failures, actions, time.perf_counter() - started
+
+
+def check_replays(paths):
+    """проверка журнала и отката на записях: [(путь, что разошлось)]"""
+    failures = []
+    for path in paths:
+        try:
+            problem = Replay.load(path).check_log()
+        except ValueError as e:
+            problem = str(e)
+        if problem is not None:
+            failures.append((path, problem))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Bloody Requiem matches")
+    parser.add_argument("paths", nargs="*", help="replay files (default: all fixtures)")
+    parser.add_argument("--repeat", type=int, default=1, help="replay every file this many times")
+    parser.add_argument("--render", action="store_true", help="watch the first replay in the game window")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed for --render")
+    parser.add_argument("--generate", type=int, default=0, metavar="GAMES", help="record new fixtures")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first generated fixture")
+    parser.add_argument("--p1", choices=sorted(POLICIES), default="greedy", help="policy of player 1")
+    parser.add_argument("--p2", choices=sorted(POLICIES), default="random", help="policy of player 2")
+    args = parser.parse_args()
+
+    if args.generate:
+        paths = generate_fixtures(FIXTURE_DIR, args.generate, args.seed, args.p1, args.p2)
+        print(f"Recorded {len(paths)} fixtures in {FIXTURE_DIR}")
+        return
+
+    paths = args.paths or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.hsr")))
+    if not paths:
+        print("No replays given and no fixtures found")
+        sys.exit(1)
+
+    if args.render:
+        import main as game
+        game.main(["main.py", f"--replay={paths[0]}", f"--replay-speed={args.speed}"])
+        return
+
+    failures, actions, elapsed = run_replays(paths, args.repeat)
+    games = len(paths) * args.repeat
+    print(f"Replayed {games} games, {actions} actions in {elapsed:.3f} s "
+          f"({games / elapsed if elapsed else 0:.0f} games/s, {actions / elapsed if elapsed else 0:.0f} actions/s)")
+    for path in failures:
+        print(f"MISMATCH {path}")
+    #вне замера: повтор с журналом заметно медленнее
+    log_failures = check_replays(paths)
+    for path, problem in log_failures:
+        print(f"MISMATCH {path}: {problem}")
+    if failures or log_failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import pygame
+
+
+class IdleScheduler:
+    """планировщик кадров: полный фпс при анимации, сон без неё"""
+
+    def __init__(self, fps=60, idle_timeout=500, background_fps=10, hidden_timeout=2000):
+        self.clock = pygame.time.Clock()
+        self.fps = fps
+        #сколько ждать ввода в простое, мс
+        self.idle_timeout = idle_timeout
+        #фпс анимаций в неактивном окне
+        self.background_fps = background_fps
+        #сколько спать в свёрнутом окне, мс
+        self.hidden_timeout = hidden_timeout
+
+        #состояние окна
+        self.focused = True
+        self.minimized = False
+
+        #статистика
+        self.busy_frames = 0
+        self.idle_wakeups = 0
+
+    def track_window(self, event):
+        """фокус и сворачивание окна"""
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.focused = True
+        elif event.type == pygame.WINDOWMINIMIZED:
+            self.minimized = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWMAXIMIZED, pygame.WINDOWSHOWN):
+            self.minimized = False
+
+    def next_events(self, busy):
+        """события следующего кадра, busy - идёт анимация"""
+        if busy and not self.minimized:
+            #анимация - обычный кадр, в фоне реже
+            self.clock.tick(self.fps if self.focused else self.background_fps)
+            self.busy_frames += 1
+            events = pygame.event.get()
+        else:
+            #ничего не меняется - спим до ввода
+            timeout = self.hidden_timeout if self.minimized or not self.focused else self.idle_timeout
+            event = pygame.event.wait(timeout)
+            self.idle_wakeups += 1
+            events = [] if event.type == pygame.NOEVENT else [event]
+            events.extend(pygame.event.get())
+            #сброс часов, чтобы сон не считался кадром
+            self.clock.tick()
+
+        for event in events:
+            self.track_window(event)
+        return events
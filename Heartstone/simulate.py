@@ -0,0 +1,221 @@
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from engine import (GameState, CardType, Action, TEMPLATES, PLAY_CARD, ATTACK, END_TURN, MASK_BITS, decode_action,
+                    EFFECT_DAMAGE, EFFECT_HEAL,
+                    TARGET_NONE, TARGET_ENEMY_HERO, TARGET_OWN_HERO, TARGET_ENEMY_MINION, TARGET_OWN_MINION)
+
+#сколько действий максимум за один ход, защита от зацикленных стратегий
+ACTIONS_PER_TURN = 40
+
+END_TURN_ACTION = Action(END_TURN, 0, TARGET_NONE)
+
+
+def random_policy(state, rng):
+    """случайное допустимое действие"""
+    return decode_action(rng.choice(state.legal_actions()))
+
+
+def greedy_policy(state, rng):
+    """карты по порядку руки, урон в лицо, атака существом, которое умрёт, иначе в лицо"""
+    player = state.current_player
+    enemy = state.other_player
+
+    #по маскам: только карты по карману и готовые существа
+    for i in MASK_BITS[state.affordable]:
+        template = player.hand[i].template
+        if template.card_type == CardType.MINION:
+            if not player.board.is_full():
+                return Action(PLAY_CARD, i, TARGET_NONE)
+        elif template.effect[0] == EFFECT_DAMAGE:
+            return Action(PLAY_CARD, i, TARGET_ENEMY_HERO)
+        elif template.effect[0] == EFFECT_HEAL:
+            return Action(PLAY_CARD, i, TARGET_OWN_HERO)
+        elif player.board:
+            return Action(PLAY_CARD, i, TARGET_OWN_MINION)
+
+    for i in MASK_BITS[state.ready]:
+        minion = player.board[i]
+        for j, target in enumerate(enemy.board):
+            if target.health <= minion.attack:
+                return Action(ATTACK, i, TARGET_ENEMY_MINION + j)
+        return Action(ATTACK, i, TARGET_ENEMY_HERO)
+
+    return END_TURN_ACTION
+
+
+def trade_policy(state, rng):
+    """сначала размен с самым сильным существом соперника, потом как greedy"""
+    enemy = state.other_player
+
+    if enemy.board:
+        strongest = max(range(len(enemy.board)), key=lambda j: enemy.board[j].attack)
+        if state.ready:
+            return Action(ATTACK, MASK_BITS[state.ready][0], TARGET_ENEMY_MINION + strongest)
+
+    return greedy_policy(state, rng)
+
+
+#стратегии по имени, чтобы их можно было передать в другой процесс
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "trade": trade_policy,
+}
+
+
+def run_game(state, policies, rng, turn_cap=100, plays=None):
+    """доигрывание партии стратегиями сторон, plays - списки сыгранных id для каждой стороны"""
+    while not state.is_over() and state.turn_number <= turn_cap:
+        side = 0 if state.current_player is state.player1 else 1
+        policy = policies[side]
+
+        for _ in range(ACTIONS_PER_TURN):
+            action = policy(state, rng)
+            if action.kind == END_TURN:
+                break
+            template_id = None
+            if plays is not None and action.kind == PLAY_CARD and action.index < len(state.current_player.hand):
+                template_id = state.current_player.hand[action.index].template.id
+            if state.apply(action) and template_id is not None:
+                plays[side].append(template_id)
+            if state.is_over():
+                break
+
+        if not state.is_over():
+            state.end_turn()
+    return state
+
+
+def winner_side(state):
+    """победитель 0/1, -1 если партия не закончена"""
+    if state.winner is state.player1:
+        return 0
+    if state.winner is state.player2:
+        return 1
+    return -1
+
+
+def play_game(seed, policy1="greedy", policy2="greedy", turn_cap=100):
+    """одна партия: (сид, победитель 0/1 или -1 при ничьей, число ходов, сыгранные карты игроков)"""
+    state = GameState(seed=seed, record=False)
+    plays = ([], [])
+    run_game(state, (POLICIES[policy1], POLICIES[policy2]), random.Random(seed), turn_cap, plays)
+    return seed, winner_side(state), state.turn_number, tuple(plays[0]), tuple(plays[1])
+
+
+def play_batch(seeds, policy1, policy2, turn_cap):
+    """пачка партий в одном процессе"""
+    return [play_game(seed, policy1, policy2, turn_cap) for seed in seeds]
+
+
+class SimulationStats:
+    """накопленная статистика партий"""
+
+    def __init__(self):
+        self.games = 0
+        self.wins = [0, 0]
+        self.draws = 0
+        self.total_turns = 0
+
+        #по id шаблона: сколько раз сыграна, в скольких партиях, в скольких из них победа
+        self.card_plays = Counter()
+        self.card_games = Counter()
+        self.card_wins = Counter()
+
+    def add(self, result):
+        """учёт одной партии"""
+        seed, winner, turns, plays1, plays2 = result
+        self.games += 1
+        self.total_turns += turns
+        if winner < 0:
+            self.draws += 1
+        else:
+            self.wins[winner] += 1
+
+        for side, plays in enumerate((plays1, plays2)):
+            self.card_plays.update(plays)
+            for template_id in set(plays):
+                self.card_games[template_id] += 1
+                if winner == side:
+                    self.card_wins[template_id] += 1
+
+    def card_table(self):
+        """(имя, сыграна раз, партий, винрейт с картой) по убыванию винрейта"""
+        rows = []
+        for template_id, games in self.card_games.items():
+            rows.append((TEMPLATES[template_id].name, self.card_plays[template_id], games,
+                         self.card_wins[template_id] / games))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def report(self, elapsed):
+        """текстовый отчёт"""
+        games = max(self.games, 1)
+        lines = [
+            f"Games: {self.games} in {elapsed:.2f} s ({self.games / elapsed if elapsed else 0:.0f} games/s)",
+            f"Player 1 wins: {self.wins[0] / games:.1%}  Player 2 wins: {self.wins[1] / games:.1%}  "
+            f"Draws: {self.draws / games:.1%}",
+            f"Average game length: {self.total_turns / games:.1f} turns",
+            "",
+            f"{'Card':<22}{'Plays':>9}{'Games':>9}{'Win rate':>10}",
+        ]
+        for name, plays, card_games, win_rate in self.card_table():
+            lines.append(f"{name:<22}{plays:>9}{card_games:>9}{win_rate:>10.1%}")
+        return "\n".join(lines)
+
+
+def simulate(games, policy1="greedy", policy2="greedy", seed=0, workers=None, chunk=200,
+             turn_cap=100, progress=None):
+    """games партий в пуле процессов, сид партии i - seed + i"""
+    stats = SimulationStats()
+    seeds = range(seed, seed + games)
+    batches = [seeds[i:i + chunk] for i in range(0, games, chunk)]
+
+    if workers == 1:
+        #без пула: удобно для профилирования
+        for batch in batches:
+            for result in play_batch(batch, policy1, policy2, turn_cap):
+                stats.add(result)
+            if progress:
+                progress(stats)
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_batch, batch, policy1, policy2, turn_cap) for batch in batches]
+        #результаты учитываются по мере готовности пачек
+        for future in as_completed(futures):
+            for result in future.result():
+                stats.add(result)
+            if progress:
+                progress(stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch simulation of Bloody Requiem games")
+    parser.add_argument("-n", "--games", type=int, default=1000, help="number of games")
+    parser.add_argument("--p1", choices=sorted(POLICIES), default="greedy", help="policy of player 1")
+    parser.add_argument("--p2", choices=sorted(POLICIES), default="greedy", help="policy of player 2")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk", type=int, default=200, help="games per task")
+    parser.add_argument("--turn-cap", type=int, default=100, help="turns before a game counts as a draw")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def progress(stats):
+        print(f"\r{stats.games}/{args.games} games", end="", file=sys.stderr, flush=True)
+
+    stats = simulate(args.games, args.p1, args.p2, args.seed, args.workers, args.chunk,
+                     args.turn_cap, progress)
+    print(file=sys.stderr)
+    print(stats.report(time.perf_counter() - started))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import threading
+
+
+def write_atomic(path, *chunks):
+    """запись файла целиком: во временный и атомарная замена, половины файла не бывает"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    #своё имя на процесс и поток, чтобы одновременные записи не затирали друг друга
+    temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temp, path)
+    except BaseException:
+        #недописанный временный файл не оставляем
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
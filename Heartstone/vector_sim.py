@@ -0,0 +1,322 @@
+import sys
+import time
+import random
+import argparse
+import numpy as np
+from engine import (GameState, CardType, TEMPLATES, HAND_LIMIT, BOARD_LIMIT, DECK_SIZE,
+                    EFFECT_DAMAGE, EFFECT_HEAL, EFFECT_BUFF, create_random_deck, create_decks)
+from simulate import run_game, winner_side, greedy_policy
+
+#стартовые здоровье и мана, как в PlayerState
+MAX_HEALTH = 30
+MAX_MANA = 10
+START_HAND = 3
+
+
+def compile_tables():
+    """статы шаблонов в массивы по id: стоимость, атака, здоровье, тип, код эффекта и его параметры"""
+    count = len(TEMPLATES)
+    tables = {
+        "cost": np.zeros(count, np.int32),
+        "attack": np.zeros(count, np.int32),
+        "health": np.zeros(count, np.int32),
+        "minion": np.zeros(count, bool),
+        "effect": np.zeros(count, np.int32),
+        "effect_a": np.zeros(count, np.int32),
+        "effect_b": np.zeros(count, np.int32),
+    }
+    for template in TEMPLATES:
+        i = template.id
+        tables["cost"][i] = template.cost
+        tables["attack"][i] = template.attack
+        tables["health"][i] = template.health
+        tables["minion"][i] = template.card_type == CardType.MINION
+        #те же коды, что разбирает engine.EFFECTS
+        tables["effect"][i], tables["effect_a"][i], tables["effect_b"][i] = template.effect
+    return tables
+
+
+def decks_for_seeds(seeds):
+    """колоды (N, 2, DECK_SIZE) как у GameState(seed=...)"""
+    decks = np.zeros((len(seeds), 2, DECK_SIZE), np.int32)
+    for g, seed in enumerate(seeds):
+        rng = random.Random(seed)
+        for side in range(2):
+            decks[g, side] = [template.id for template in create_random_deck(rng)]
+    return decks
+
+
+class VectorGames:
+    """много партий сразу: состояние в массивах (партия, сторона, слот), ход greedy-стратегии за шаг"""
+
+    def __init__(self, decks, turn_cap=100):
+        self.tables = compile_tables()
+        count = len(decks)
+        self.count = count
+        self.turn_cap = turn_cap
+        self.rows = np.arange(count)
+        self.slots = np.arange(BOARD_LIMIT)
+
+        #герои
+        self.health = np.full((count, 2), MAX_HEALTH, np.int32)
+        self.mana = np.ones((count, 2), np.int32)
+        self.max_mana = np.ones((count, 2), np.int32)
+
+        #колода и рука: id шаблонов, -1 - пустой слот
+        self.deck = np.asarray(decks, np.int32)
+        self.deck_pos = np.zeros((count, 2), np.int32)
+        self.hand = np.full((count, 2, HAND_LIMIT), -1, np.int32)
+        self.hand_count = np.zeros((count, 2), np.int32)
+
+        #стол
+        self.board = np.full((count, 2, BOARD_LIMIT), -1, np.int32)
+        self.board_attack = np.zeros((count, 2, BOARD_LIMIT), np.int32)
+        self.board_health = np.zeros((count, 2, BOARD_LIMIT), np.int32)
+        self.board_max_health = np.zeros((count, 2, BOARD_LIMIT), np.int32)
+        self.board_ready = np.zeros((count, 2, BOARD_LIMIT), bool)
+        self.board_count = np.zeros((count, 2), np.int32)
+
+        #очередь хода и итог
+        self.current = np.zeros(count, np.int32)
+        self.turn = np.ones(count, np.int32)
+        self.winner = np.full(count, -1, np.int32)
+        self.done = np.zeros(count, bool)
+        self.steps = 0
+
+        #начальная рука
+        for side in range(2):
+            sides = np.full(count, side, np.int32)
+            for _ in range(START_HAND):
+                self.draw(self.rows, sides)
+
+    @classmethod
+    def from_seeds(cls, seeds, turn_cap=100):
+        """те же партии, что GameState(seed) для каждого сида"""
+        return cls(decks_for_seeds(seeds), turn_cap)
+
+    @classmethod
+    def random(cls, count, seed=None, turn_cap=100):
+        """count партий со случайными колодами из create_decks"""
+        decks = create_decks(count * 2, seed, as_array=True).reshape(count, 2, DECK_SIZE)
+        return cls(decks, turn_cap)
+
+    def draw(self, g, side):
+        """взятие карты, если колода не пуста и в руке есть место"""
+        pos = self.deck_pos[g, side]
+        hand_count = self.hand_count[g, side]
+        can = (pos < DECK_SIZE) & (hand_count < HAND_LIMIT)
+        g, side, pos, hand_count = g[can], side[can], pos[can], hand_count[can]
+        self.hand[g, side, hand_count] = self.deck[g, side, pos]
+        self.deck_pos[g, side] = pos + 1
+        self.hand_count[g, side] = hand_count + 1
+
+    def remove_from_hand(self, g, side, index):
+        """убрать карту из руки со сдвигом следующих"""
+        source = np.minimum(self.slots + (self.slots >= index[:, None]), HAND_LIMIT - 1)
+        hand = np.take_along_axis(self.hand[g, side], source, 1)
+        hand_count = self.hand_count[g, side] - 1
+        hand[np.arange(len(g)), hand_count] = -1
+        self.hand[g, side] = hand
+        self.hand_count[g, side] = hand_count
+
+    def compact(self, g, side):
+        """убрать мёртвых со стола, живые сохраняют порядок"""
+        health = self.board_health[g, side]
+        alive = (health > 0) & (self.slots < self.board_count[g, side][:, None])
+        order = np.argsort(~alive, axis=1, kind="stable")
+        count = alive.sum(1)
+        empty = self.slots >= count[:, None]
+        for name, blank in (("board", -1), ("board_attack", 0), ("board_health", 0),
+                            ("board_max_health", 0), ("board_ready", False)):
+            array = getattr(self, name)
+            values = np.take_along_axis(array[g, side], order, 1)
+            values[empty] = blank
+            array[g, side] = values
+        self.board_count[g, side] = count
+
+    def check_winner(self, g):
+        """победитель как в GameState.check_winner"""
+        first_dead = self.health[g, 0] <= 0
+        second_dead = self.health[g, 1] <= 0
+        winner = np.where(first_dead, 1, np.where(second_dead, 0, -1))
+        self.winner[g] = winner
+        self.done[g] |= winner >= 0
+
+    def play(self, g, side, index):
+        """розыгрыш карты из руки, цели как у greedy_policy"""
+        t = self.tables
+        card = self.hand[g, side, index]
+        self.mana[g, side] -= t["cost"][card]
+        self.remove_from_hand(g, side, index)
+
+        #существа на стол
+        m = t["minion"][card]
+        gm, sm, cm = g[m], side[m], card[m]
+        pos = self.board_count[gm, sm]
+        self.board[gm, sm, pos] = cm
+        self.board_attack[gm, sm, pos] = t["attack"][cm]
+        self.board_health[gm, sm, pos] = t["health"][cm]
+        self.board_max_health[gm, sm, pos] = t["health"][cm]
+        self.board_ready[gm, sm, pos] = False
+        self.board_count[gm, sm] = pos + 1
+
+        effect = t["effect"][card]
+        amount = t["effect_a"][card]
+
+        #урон в героя соперника
+        d = ~m & (effect == EFFECT_DAMAGE)
+        self.health[g[d], 1 - side[d]] -= amount[d]
+
+        #лечение своего героя
+        h = ~m & (effect == EFFECT_HEAL)
+        self.health[g[h], side[h]] = np.minimum(MAX_HEALTH, self.health[g[h], side[h]] + amount[h])
+
+        #бафф первого своего существа, может его убить
+        b = ~m & (effect == EFFECT_BUFF)
+        gb, sb, cb = g[b], side[b], card[b]
+        self.board_attack[gb, sb, 0] += amount[b]
+        self.board_health[gb, sb, 0] += t["effect_b"][cb]
+        self.compact(gb, sb)
+
+        self.check_winner(g[d])
+
+    def attack(self, g, side, ready):
+        """первое готовое существо бьёт первое существо, которое убьёт, иначе героя"""
+        attacker = ready.argmax(1)
+        enemy = 1 - side
+        attack = self.board_attack[g, side, attacker]
+        kills = ((self.slots < self.board_count[g, enemy][:, None]) &
+                 (self.board_health[g, enemy] <= attack[:, None]))
+        on_minion = kills.any(1)
+        target = kills.argmax(1)
+        self.board_ready[g, side, attacker] = False
+
+        #размен: цель получает урон и бьёт в ответ
+        gm, sm, em, am, tm = g[on_minion], side[on_minion], enemy[on_minion], attacker[on_minion], target[on_minion]
+        self.board_health[gm, em, tm] -= attack[on_minion]
+        self.board_health[gm, sm, am] -= np.maximum(self.board_attack[gm, em, tm], 0)
+        self.compact(gm, sm)
+        self.compact(gm, em)
+
+        #удар в героя
+        f = ~on_minion
+        self.health[g[f], enemy[f]] -= attack[f]
+        self.check_winner(g[f])
+
+    def end_turn(self, g, side):
+        """передача хода и начало хода соперника"""
+        self.turn[g] += 1
+        side = 1 - side
+        self.current[g] = side
+        self.max_mana[g, side] = np.minimum(self.max_mana[g, side] + 1, MAX_MANA)
+        self.mana[g, side] = self.max_mana[g, side]
+        self.draw(g, side)
+        self.board_ready[g, side] = self.slots < self.board_count[g, side][:, None]
+        #лимит ходов - ничья
+        self.done[g] |= self.turn[g] > self.turn_cap
+
+    def step(self):
+        """одно действие во всех незаконченных партиях, False если все закончены"""
+        g = np.nonzero(~self.done)[0]
+        if not len(g):
+            return False
+        self.steps += 1
+        t = self.tables
+        side = self.current[g]
+
+        #первая карта руки, которую greedy может сыграть
+        hand = self.hand[g, side]
+        in_hand = self.slots < self.hand_count[g, side][:, None]
+        card = np.where(in_hand, hand, 0)
+        board_count = self.board_count[g, side][:, None]
+        effect = t["effect"][card]
+        placeable = np.where(t["minion"][card], board_count < BOARD_LIMIT,
+                             (effect == EFFECT_DAMAGE) | (effect == EFFECT_HEAL) | (board_count > 0))
+        playable = in_hand & (t["cost"][card] <= self.mana[g, side][:, None]) & placeable
+        has_play = playable.any(1)
+
+        #готовые к атаке существа
+        ready = (self.board_ready[g, side] & (self.board_attack[g, side] > 0) &
+                 (self.slots < board_count))
+        has_attack = ~has_play & ready.any(1)
+        ends = ~has_play & ~has_attack
+
+        self.play(g[has_play], side[has_play], playable[has_play].argmax(1))
+        self.attack(g[has_attack], side[has_attack], ready[has_attack])
+        self.end_turn(g[ends], side[ends])
+        return True
+
+    def run(self):
+        """доигрывание всех партий"""
+        while self.step():
+            pass
+        return self
+
+    def results(self):
+        """победители, число ходов и здоровье героев"""
+        return self.winner, self.turn, self.health
+
+
+def verify(seeds, turn_cap=100):
+    """сверка с GameState на тех же сидах, возвращает сиды с расхождениями"""
+    games = VectorGames.from_seeds(seeds, turn_cap).run()
+    mismatches = []
+    for g, seed in enumerate(seeds):
+        state = run_game(GameState(seed=seed), (greedy_policy, greedy_policy), random.Random(seed), turn_cap)
+        players = (state.player1, state.player2)
+        expected = (
+            winner_side(state),
+            state.turn_number,
+            [(p.health, p.mana, p.max_mana, len(p.deck)) for p in players],
+            [[c.template.id for c in p.hand] for p in players],
+            [[(c.template.id, c.attack, c.health) for c in p.board] for p in players],
+        )
+        actual = (
+            int(games.winner[g]),
+            int(games.turn[g]),
+            [(int(games.health[g, s]), int(games.mana[g, s]), int(games.max_mana[g, s]),
+              DECK_SIZE - int(games.deck_pos[g, s])) for s in range(2)],
+            [games.hand[g, s, :games.hand_count[g, s]].tolist() for s in range(2)],
+            [list(zip(games.board[g, s, :games.board_count[g, s]].tolist(),
+                      games.board_attack[g, s, :games.board_count[g, s]].tolist(),
+                      games.board_health[g, s, :games.board_count[g, s]].tolist())) for s in range(2)],
+        )
+        if expected != actual:
+            mismatches.append(seed)
+    return mismatches
+
+
+def benchmark(count, seed=0, turn_cap=100):
+    """партий в секунду для count партий сразу"""
+    started = time.perf_counter()
+    games = VectorGames.random(count, seed, turn_cap).run()
+    elapsed = time.perf_counter() - started
+    return count / elapsed, games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized greedy-vs-greedy simulation of Bloody Requiem")
+    parser.add_argument("-n", "--games", type=int, default=100000, help="games played in lockstep")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the decks")
+    parser.add_argument("--turn-cap", type=int, default=100, help="turns before a game counts as a draw")
+    parser.add_argument("--verify", type=int, default=0, help="check this many seeds against the scalar engine")
+    args = parser.parse_args()
+
+    if args.verify:
+        seeds = list(range(args.seed, args.seed + args.verify))
+        mismatches = verify(seeds, args.turn_cap)
+        print(f"Verified {len(seeds)} games against engine.GameState: {len(mismatches)} mismatches")
+        if mismatches:
+            print(f"First mismatching seeds: {mismatches[:10]}")
+            sys.exit(1)
+
+    games_per_second, games = benchmark(args.games, args.seed, args.turn_cap)
+    winner = games.winner
+    print(f"Games: {games.count} in {games.steps} steps ({games_per_second:.0f} games/s)")
+    print(f"Player 1 wins: {(winner == 0).mean():.1%}  Player 2 wins: {(winner == 1).mean():.1%}  "
+          f"Draws: {(winner < 0).mean():.1%}")
+    print(f"Average game length: {games.turn.mean():.1f} turns")
+
+
+if __name__ == "__main__":
+    main()